@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 class OptimizationRequest(BaseModel):
     glass_type: str
@@ -20,3 +20,6 @@ class WarehouseRemainderRequest(BaseModel):
 
 class WarehouseMainMaterialRequest(BaseModel):
     goodsid: int
+
+class WarehouseBulkRequest(BaseModel):
+    goodsids: List[int]
@@ -1,6 +1,9 @@
 from fastapi import APIRouter, HTTPException
-from modules.models import DetailsRawRequest, WarehouseRemainderRequest, WarehouseMainMaterialRequest
-from utils.db_functions import get_tables, get_details_raw, get_warehouse_remainders, get_warehouse_main_material, get_goods_price
+from modules.models import DetailsRawRequest, WarehouseRemainderRequest, WarehouseMainMaterialRequest, WarehouseBulkRequest
+from utils.db_functions import (
+    get_tables, get_details_raw, get_warehouse_remainders, get_warehouse_main_material, get_goods_price,
+    get_warehouse_remainders_bulk, get_warehouse_main_material_bulk,
+)
 import asyncio
 import time
 
@@ -58,6 +61,20 @@ def warehouse_remainders(request: WarehouseRemainderRequest):
 def warehouse_main_material(request: WarehouseMainMaterialRequest):
     return get_warehouse_main_material(request.goodsid)
 
+@router.post("/warehouse-remainders-bulk")
+def warehouse_remainders_bulk(request: WarehouseBulkRequest):
+    """
+    Остатки склада сразу для списка goodsid (один запрос вместо запроса на каждый goodsid)
+    """
+    return get_warehouse_remainders_bulk(request.goodsids)
+
+@router.post("/warehouse-main-material-bulk")
+def warehouse_main_material_bulk(request: WarehouseBulkRequest):
+    """
+    Основные материалы склада сразу для списка goodsid
+    """
+    return get_warehouse_main_material_bulk(request.goodsids)
+
 @router.post("/goods-price")
 def goods_price(request: WarehouseRemainderRequest):
     """
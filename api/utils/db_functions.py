@@ -259,6 +259,114 @@ def get_warehouse_main_material(goodsid: int):
         print("DB ERROR (warehouse-main-material):", e)
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+def _goods_prices(cur, goodsids: list) -> dict:
+    """Цены (price1) для списка goodsid одним запросом: {goodsid: цена}"""
+    placeholders = ",".join("?" * len(goodsids))
+    cur.execute(f"SELECT g.goodsid, COALESCE(g.price1, 0) FROM goods g WHERE g.goodsid IN ({placeholders})", goodsids)
+    return {row[0]: row[1] or 0 for row in cur.fetchall()}
+
+def get_warehouse_remainders_bulk(goodsids: list):
+    """
+    Остатки склада для списка goodsid (формат строк как у get_warehouse_remainders)
+    """
+    goodsids = list(dict.fromkeys(goodsids))
+    if not goodsids:
+        return {"remainders": []}
+    try:
+        con = get_db_connection()
+        cur = con.cursor()
+        
+        prices = _goods_prices(cur, goodsids)
+        
+        placeholders = ",".join("?" * len(goodsids))
+        sql = f"""
+        select
+            g.marking as g_marking,
+            whm.goodsid,
+            whm.width,
+            whm.height,
+            whm.qty - whm.reserveqty as qty,
+            m.amfactor
+        from warehouseremainder whm
+        join goods g on g.goodsid = whm.goodsid
+        join groupgoods gg on gg.grgoodsid = g.grgoodsid
+        join measure m on m.measureid = gg.measureid
+        where whm.goodsid in ({placeholders})
+        """
+        cur.execute(sql, goodsids)
+        result = [
+            {
+                "g_marking": row[0],
+                "goodsid": row[1],
+                "width": row[2],
+                "height": row[3],
+                "qty": row[4],
+                "amfactor": row[5],
+                "cost": prices.get(row[1], 0)
+            }
+            for row in cur.fetchall()
+        ]
+        con.close()
+        return {"remainders": result}
+    except Exception as e:
+        print("DB ERROR (warehouse-remainders-bulk):", e)
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+def get_warehouse_main_material_bulk(goodsids: list):
+    """
+    Основные материалы склада для списка goodsid (формат строк как у get_warehouse_main_material)
+    """
+    goodsids = list(dict.fromkeys(goodsids))
+    if not goodsids:
+        return {"main_material": []}
+    try:
+        con = get_db_connection()
+        cur = con.cursor()
+        
+        prices = _goods_prices(cur, goodsids)
+        
+        placeholders = ",".join("?" * len(goodsids))
+        sql = f"""
+        select t.*, wh.qty, wh.qty / t.amfactor as res_qty, wh.measureid as wh_measureid
+        from(
+            select
+                g.marking as g_marking,
+                g.goodsid,
+                ggm.measureid,
+                gg.width,
+                gg.height,
+                m.amfactor
+            from goods g
+            join groupgoods gg on gg.grgoodsid = g.grgoodsid
+            join grgoodsmeasure ggm on ggm.grgoodsid = gg.grgoodsid
+            join measure m on m.measureid = ggm.measureid
+            where g.goodsid in ({placeholders})
+            and ggm.ismain = 1
+        ) t
+        left join warehouse wh on (wh.goodsid = t.goodsid) and (wh.measureid = t.measureid)
+        """
+        cur.execute(sql, goodsids)
+        result = [
+            {
+                "g_marking": row[0],
+                "goodsid": row[1],
+                "measureid": row[2],
+                "width": row[3],
+                "height": row[4],
+                "amfactor": row[5],
+                "qty": row[6],
+                "res_qty": row[7],
+                "wh_measureid": row[8],
+                "cost": prices.get(row[1], 0)
+            }
+            for row in cur.fetchall()
+        ]
+        con.close()
+        return {"main_material": result}
+    except Exception as e:
+        print("DB ERROR (warehouse-main-material-bulk):", e)
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
 
 
 def upload_optimization_to_db(grorderid: int, sheets_data: list, adjust_materials: bool = False):
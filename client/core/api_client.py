@@ -3,33 +3,70 @@ API клиент для взаимодействия с сервером опт
 """
 
 import requests
+import itertools
 import json
+import time
 from .config import API_URL
 
+# Время жизни успешной проверки доступности API (секунды)
+API_CHECK_TTL = 30
+
+# Общая сессия: пул соединений переиспользуется между запросами (без нового TCP-подключения на каждый вызов).
+# Стандартного пула (10 соединений на хост) достаточно: одновременно идет не больше пары запросов
+_session = requests.Session()
+
+# Момент последней успешной проверки API (time.monotonic), None - проверок еще не было
+_last_api_check_ok = None
+
 def check_api_connection():
-    """Проверка доступности API"""
+    """Проверка доступности API (успешный результат кэшируется на API_CHECK_TTL секунд)"""
+    global _last_api_check_ok
+    
+    if _last_api_check_ok is not None and time.monotonic() - _last_api_check_ok < API_CHECK_TTL:
+        return True
+    
     try:
         # Используем существующий endpoint /tables для проверки
-        response = requests.get(f"{API_URL}/tables", timeout=120)
-        return response.status_code == 200
+        response = _session.get(f"{API_URL}/tables", timeout=120)
+        if response.status_code == 200:
+            _last_api_check_ok = time.monotonic()
+            return True
+        _last_api_check_ok = None
+        return False
     except Exception as e:
+        _last_api_check_ok = None
         print(f"API connection error: {e}")
         return False
 
-def api_request(endpoint, data=None, method='GET'):
-    """Универсальная функция для API запросов"""
+class TransientAPIError(Exception):
+    """Временный сбой API (нет соединения, таймаут, ответ 5xx) - запрос имеет смысл повторить"""
+
+
+def _is_transient(error):
+    """Временная ли ошибка запроса: сетевой сбой или ответ сервера 5xx"""
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    response = getattr(error, 'response', None)
+    return response is not None and response.status_code >= 500
+
+def api_request(endpoint, data=None, method='GET', raise_transient=False):
+    """
+    Универсальная функция для API запросов.
+    Ошибки дают None; с raise_transient=True временные сбои (см. _is_transient)
+    вызывают TransientAPIError, чтобы вызывающий код мог повторить запрос
+    """
     url = f"{API_URL}/{endpoint.lstrip('/')}"
     
     try:
         if method == 'POST':
-            response = requests.post(
+            response = _session.post(
                 url, 
                 json=data,  # Используем json= вместо data=
                 headers={'Content-Type': 'application/json'}, 
                 timeout=120
             )
         else:
-            response = requests.get(url, timeout=120)
+            response = _session.get(url, timeout=120)
         
         response.raise_for_status()
         
@@ -53,16 +90,18 @@ def api_request(endpoint, data=None, method='GET'):
         
     except requests.exceptions.RequestException as e:
         print(f"Request error: {e}")
+        if raise_transient and _is_transient(e):
+            raise TransientAPIError(str(e)) from e
         return None
 
 def get_tables():
     """Получение списка таблиц"""
     return api_request('tables', method='GET')
 
-def get_details_raw(grorderid):
+def get_details_raw(grorderid, raise_transient=False):
     """Получение сырых данных деталей по номеру заказа"""
     data = {"grorderid": grorderid}
-    return api_request('details-raw', data, 'POST')
+    return api_request('details-raw', data, 'POST', raise_transient)
 
 def get_warehouse_main_material(goodsid):
     """Получение основных материалов склада"""
@@ -74,6 +113,33 @@ def get_warehouse_remainders(goodsid):
     data = {"goodsid": goodsid}
     return api_request('warehouse-remainders', data, 'POST')
 
+# Максимум goodsid в одном bulk-запросе (размер тела запроса и IN-списка на сервере)
+BULK_CHUNK_SIZE = 500
+
+def _bulk_request(endpoint, goodsids, field, raise_transient=False):
+    """Bulk-запрос по списку goodsid частями по BULK_CHUNK_SIZE; None, если хотя бы одна часть не загрузилась"""
+    goodsids = list(goodsids)
+    parts = []
+    for start in range(0, len(goodsids), BULK_CHUNK_SIZE):
+        response = api_request(endpoint, {"goodsids": goodsids[start:start + BULK_CHUNK_SIZE]}, 'POST', raise_transient)
+        if response is None:
+            return None
+        part = response.get(field)
+        if part:
+            parts.append(part)
+    # Обычно часть одна - ее список возвращается как есть, без копирования строк
+    if len(parts) == 1:
+        return {field: parts[0]}
+    return {field: list(itertools.chain.from_iterable(parts))}
+
+def get_warehouse_remainders_bulk(goodsids, raise_transient=False):
+    """Получение остатков склада сразу для списка goodsid"""
+    return _bulk_request('warehouse-remainders-bulk', goodsids, 'remainders', raise_transient)
+
+def get_warehouse_main_material_bulk(goodsids, raise_transient=False):
+    """Получение основных материалов склада сразу для списка goodsid"""
+    return _bulk_request('warehouse-main-material-bulk', goodsids, 'main_material', raise_transient)
+
 def get_goods_price(goodsid):
     """Получение стоимости товара по goodsid"""
     data = {"goodsid": goodsid}
@@ -118,7 +184,7 @@ def upload_optimization_data(grorderid: int, optimization_data: list, adjust_mat
                 sample_sheet['xml_data'] = f"<XML data, {len(sample_sheet['xml_data'])} chars>"
             print(f"📋 API: Пример данных листа: {sample_sheet}")
         
-        response = requests.post(url, json=payload, timeout=120)
+        response = _session.post(url, json=payload, timeout=120)
         
         if response.status_code == 200:
             result = response.json()
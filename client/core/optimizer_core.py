@@ -152,6 +152,19 @@ class SheetLayout:
         """Для совместимости со старым кодом"""
         return [FreeRectangle(r.x, r.y, r.width, r.height) for r in self.get_waste()]
     
+    @property
+    def rects_xyxy(self) -> Tuple[List[float], List[float], List[float], List[float]]:
+        """
+        Координаты деталей, остатков и отходов параллельными списками (x0, y0, x1, y1).
+        Порядок как в placed_details + free_rectangles + waste_rectangles, но без создания
+        объектов PlacedDetail/FreeRectangle. Считается при каждом обращении, т.к. placed_items изменяемый
+        """
+        items = self.get_placed_details() + self.get_remnants() + self.get_waste()
+        return ([item.x for item in items],
+                [item.y for item in items],
+                [item.x + item.width for item in items],
+                [item.y + item.height for item in items])
+    
     @property
     def total_area(self):
         return self.sheet.area
@@ -277,7 +277,9 @@ VISUALIZATION_DEFAULTS = {
     'zoom_min': 10,
     'zoom_max': 500,
     'zoom_default': 100,
-    'grid_size': 50
+    'grid_size': 50,
+    # Отрисовка через OpenGL (QOpenGLWidget). Выключено по умолчанию: на части машин нет драйверов OpenGL
+    'use_opengl': False
 }
 
 # Цвета для визуализации
@@ -5,7 +5,7 @@
 
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QListWidget, 
-    QTableWidget, QTableWidgetItem, QCheckBox, QSpinBox, QGroupBox, 
+    QTableWidget, QTableWidgetItem, QTableView, QCheckBox, QSpinBox, QGroupBox, 
     QPushButton, QGraphicsView, QGraphicsScene, QFormLayout, QLineEdit, 
     QTabWidget, QComboBox, QDialog, QProgressBar, QMessageBox, QHeaderView,
     QSplitter, QFrame, QTextEdit, QSlider
@@ -16,12 +16,17 @@ import sys
 import threading
 from datetime import datetime
 # Исправленные импорты для модульной архитектуры
-from core.api_client import get_details_raw, get_warehouse_main_material, get_warehouse_remainders, check_api_connection
+from core.api_client import (get_details_raw, get_warehouse_main_material, get_warehouse_remainders,
+                             check_api_connection, upload_optimization_data)
 from core.optimizer_core import optimize, OptimizationResult
-from .table_widgets import (_create_text_item, _create_numeric_item,
+from .table_widgets import (_create_text_item, _create_numeric_item, _bulk_table_update, RectTableModel,
                            fill_details_table, fill_materials_table, fill_remainders_table,
                            update_remnants_result_table, update_waste_results_table)
 import functools
+from bisect import bisect_left
+from itertools import compress
+from operator import ne
+from xml.sax.saxutils import escape as _xml_escape
 import requests
 import os
 import json
@@ -30,11 +35,124 @@ from .dialogs import DebugDialog, ProgressDialog
 from .settings_manager import SettingsManager
 from .password_manager import PasswordManager
 from .password_dialog import PasswordManagementDialog
+from .visualization_widgets import setup_opengl_viewport, setup_view_only_scene, _grid_path
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
 
+# Шаблоны XML раскроя для Altawin (формат ElementTree после indent(space="  ")).
+# Текст glass - наименование материала с двойным пробелом; при пустом наименовании остается "  "
+_XML_HEADER_TMPL = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<cutting version="2.1">\n'
+    '  <header>\n'
+    '    <glass id="{id}" width="{width}" height="{height}" remainder="{remainder}">{material}  <params>\n'
+    '        <minwidth>{minwidth}</minwidth>\n'
+    '        <minheight>{minheight}</minheight>\n'
+    '        <border left="0" right="0" top="0" bottom="0" />\n'
+    '        <cutwidth>0</cutwidth>\n'
+    '      </params>\n'
+    '    </glass>\n'
+    '  </header>\n'
+)
+_PIECE_TMPL = '    <piece num="{num}" width="{width}" height="{height}" direction="{direction}">{text}</piece>\n'
+_MAP_PIECE_TMPL = '    <piece num="{num}" x="{x}" y="{y}" rotate="{rotate}" />\n'
+_VERT_CUT_TMPL = '    <cut x="{x}" orientation="vert" y1="{y1}" y2="{y2}" />\n'
+_HORIZ_CUT_TMPL = '    <cut y="{y}" orientation="horiz" x1="{x1}" x2="{x2}" />\n'
+_REMAINDER_TMPL = '    <remainder x="{x}" y="{y}" width="{width}" height="{height}" waste="{waste}" />\n'
+_XML_ATTR_ENTITIES = {'"': '&quot;', '\n': '&#10;', '\r': '&#13;', '\t': '&#09;'}
+
+# Сколько готовых XML листов держать в кэше (при переполнении удаляются самые старые)
+_XML_CACHE_MAX = 256
+
+
+def _piece_text(material_name, detail, index):
+    """
+    Содержимое piece по формату Altawin:
+    строка 1 - наименование материала (артикул заполнения), строка 2 - номер документа
+    заказа стеклопакетов, строка 3 - наименование изделия
+    """
+    # Один getattr на поле (отсутствующее или пустое поле дает "")
+    gp_marking = str(getattr(detail, 'gp_marking', '') or '').strip()  # Артикул заполнения
+    orderno = str(getattr(detail, 'orderno', '') or '').strip()  # Номер документа
+    oi_name = str(getattr(detail, 'oi_name', '') or '').strip()  # Наименование стеклопакета
+    
+    line1 = f"{material_name} ({gp_marking})" if gp_marking else material_name
+    line3 = oi_name or f"Деталь {index + 1}"
+    
+    logger.debug("XML piece %d: материал+артикул='%s', orderno='%s', oi_name='%s'", index, line1, orderno, line3)
+    return f"{line1}\n{orderno}\n{line3}"
+
+
+def _mask_runs(cut_mask, coords):
+    """
+    Объединяет подряд идущие ячейки маски резов в отрезки (start, end) по координатам coords.
+    Ячейки перебираются по возрастанию, поэтому сортировка и отдельный проход слияния не нужны
+    """
+    run_start = run_end = None
+    for k in compress(range(len(coords) - 1), cut_mask):
+        if k != run_end:
+            # Разрыв - закрываем предыдущий отрезок и начинаем новый
+            if run_start is not None:
+                yield coords[run_start], coords[run_end]
+            run_start = k
+        run_end = k + 1
+    if run_start is not None:
+        yield coords[run_start], coords[run_end]
+
+
+def _build_cuts_from_grid(sorted_x, sorted_y, rx0, ry0, rx1, ry1):
+    """
+    Числовое ядро генерации гильотинных резов: только числа и списки, без объектов листа.
+    
+    Возвращает (vert_cuts, horiz_cuts), где vert_cuts - список (x, y1, y2),
+    horiz_cuts - список (y, x1, x2).
+    """
+    # Сетка владения ячейками: owner[i][j] - индекс прямоугольника, занимающего ячейку
+    # [sorted_x[i], sorted_x[i+1]) x [sorted_y[j], sorted_y[j+1]), -1 - пустое место.
+    # Заполняется один раз, дальше проверка соседних ячеек - O(1) без перебора всех прямоугольников
+    nx = len(sorted_x) - 1
+    ny = len(sorted_y) - 1
+    owner = [[-1] * ny for _ in range(nx)]
+    
+    for rect_index, (x0, y0, x1, y1) in enumerate(zip(rx0, ry0, rx1, ry1)):
+        i0 = bisect_left(sorted_x, x0)
+        i1 = bisect_left(sorted_x, x1)
+        j0 = bisect_left(sorted_y, y0)
+        j1 = bisect_left(sorted_y, y1)
+        for i in range(i0, i1):
+            column = owner[i]
+            for j in range(j0, j1):
+                # При наложении побеждает первый прямоугольник (как при прежнем поиске по точке)
+                if column[j] == -1:
+                    column[j] = rect_index
+
+    vert_cuts = []
+    horiz_cuts = []
+
+    # Проверяем вертикальные резы (внутренние X координаты)
+    for i in range(1, nx):  # Исключаем границы листа
+        x = sorted_x[i]
+        # Маска сегментов по Y: слева и справа разные прямоугольники - нужен рез.
+        # Сравнение целых столбцов через map(ne, ...) выполняется без Python-цикла по ячейкам,
+        # соседние сегменты сразу объединяются в один длинный рез
+        for y1, y2 in _mask_runs(map(ne, owner[i - 1], owner[i]), sorted_y):
+            vert_cuts.append((x, y1, y2))
+
+    # Строки сетки (транспонирование) - чтобы горизонтальные резы сравнивали соседние строки целиком
+    owner_rows = list(zip(*owner))
+    
+    # Проверяем горизонтальные резы (внутренние Y координаты)
+    for j in range(1, ny):  # Исключаем границы листа
+        y = sorted_y[j]
+        # Маска сегментов по X: сверху и снизу разные прямоугольники - нужен рез
+        for x1, x2 in _mask_runs(map(ne, owner_rows[j - 1], owner_rows[j]), sorted_x):
+            horiz_cuts.append((y, x1, x2))
+
+    return vert_cuts, horiz_cuts
+
+
 class ZoomableGraphicsView(QGraphicsView):
     """Кастомный класс для поддержки зума колесиком мыши"""
     def __init__(self, scene, parent=None):
@@ -70,6 +188,12 @@ class OptimizerWindow(QWidget):
         self.optimization_result = None
         self.current_sheet_index = 0
         self.auto_load_debug = False
+        # Снимок параметров остатков на момент оптимизации (см. _get_run_context)
+        self._run_context = None
+        # Признак успешной загрузки в Altawin в текущей сессии (позволяет пропустить проверку API)
+        self._last_upload_ok = False
+        # Кэш готовых XML листов по отпечатку листа (повторная загрузка не пересобирает XML)
+        self._xml_cache = {}
         
         # Инициализация менеджера настроек
         self.settings_manager = SettingsManager()
@@ -80,6 +204,8 @@ class OptimizerWindow(QWidget):
         # Инициализация диалогов
         self.debug_dialog = None
         self.progress_dialog = None
+        # Диалог управления паролями (создается при первом открытии и переиспользуется)
+        self.password_dialog = None
         
         # Флаг для блокировки проверки пароля во время инициализации
         self._is_initializing = True
@@ -233,7 +359,7 @@ class OptimizerWindow(QWidget):
                 border-color: #0078d4;
             }
             
-            QTableWidget {
+            QTableWidget, QTableView {
                 background-color: #404040;
                 alternate-background-color: #4a4a4a;
                 gridline-color: #555555;
@@ -242,12 +368,12 @@ class OptimizerWindow(QWidget):
                 color: #ffffff;
             }
             
-            QTableWidget::item {
+            QTableWidget::item, QTableView::item {
                 padding: 8px;
                 border-bottom: 1px solid #555555;
             }
             
-            QTableWidget::item:selected {
+            QTableWidget::item:selected, QTableView::item:selected {
                 background-color: #0078d4;
                 color: white;
             }
@@ -695,15 +821,15 @@ class OptimizerWindow(QWidget):
         remnants_group = QGroupBox("Список деловых остатков")
         remnants_layout = QVBoxLayout(remnants_group)
         
-        self.remnants_result_table = QTableWidget(0, 4)
-        self.remnants_result_table.setHorizontalHeaderLabels([
-            'Наименование', 'Высота', 'Ширина', 'Кол-во'
-        ])
+        # Модель вместо QTableWidget: данные запрашиваются только для видимых строк
+        self.remnants_result_model = RectTableModel(['Наименование', 'Высота', 'Ширина', 'Кол-во'])
+        self.remnants_result_table = QTableView()
+        self.remnants_result_table.setModel(self.remnants_result_model)
         # Умная настройка ширины столбцов: автоматически по содержимому + ручная корректировка
         header = self.remnants_result_table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
         header.setStretchLastSection(True)
-        for i in range(self.remnants_result_table.columnCount()):
+        for i in range(self.remnants_result_model.columnCount()):
             header.setSectionResizeMode(i, QHeaderView.ResizeMode.ResizeToContents)
         QTimer.singleShot(100, lambda: self._set_interactive_mode(self.remnants_result_table))
         # Включаем сортировку
@@ -717,15 +843,15 @@ class OptimizerWindow(QWidget):
         waste_group = QGroupBox("Список обрезков (отходов)")
         waste_layout = QVBoxLayout(waste_group)
         
-        self.waste_results_table = QTableWidget(0, 4)
-        self.waste_results_table.setHorizontalHeaderLabels([
-            'Наименование', 'Высота', 'Ширина', 'Кол-во'
-        ])
+        # Модель вместо QTableWidget: данные запрашиваются только для видимых строк
+        self.waste_results_model = RectTableModel(['Наименование', 'Высота', 'Ширина', 'Кол-во'])
+        self.waste_results_table = QTableView()
+        self.waste_results_table.setModel(self.waste_results_model)
         # Умная настройка ширины столбцов: автоматически по содержимому + ручная корректировка
         header = self.waste_results_table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
         header.setStretchLastSection(True)
-        for i in range(self.waste_results_table.columnCount()):
+        for i in range(self.waste_results_model.columnCount()):
             header.setSectionResizeMode(i, QHeaderView.ResizeMode.ResizeToContents)
         QTimer.singleShot(100, lambda: self._set_interactive_mode(self.waste_results_table))
         # Включаем сортировку
@@ -790,6 +916,7 @@ class OptimizerWindow(QWidget):
         self.zoom_slider.setTickPosition(QSlider.TickPosition.TicksBelow)
         self.zoom_slider.setMinimumWidth(150)
         self.zoom_slider.valueChanged.connect(self.on_zoom_changed)
+        self._init_zoom_debounce()
         zoom_layout.addWidget(self.zoom_slider)
         
         self.zoom_label = QLabel("100%")
@@ -862,10 +989,14 @@ class OptimizerWindow(QWidget):
         
         # Графическая сцена
         self.graphics_scene = QGraphicsScene()
+        setup_view_only_scene(self.graphics_scene)
+        # Отрисованные листы этой сцены: {(индекс листа, размеры, названия): (группа, прямоугольник листа)}
+        self.cached_drawings = {}
         
         # Используем кастомный вид с поддержкой зума
         self.graphics_view = ZoomableGraphicsView(self.graphics_scene, self)
-        self.graphics_view.setRenderHint(QPainter.RenderHint.Antialiasing)
+        # Прямоугольники раскроя выровнены по осям - сглаживание им не нужно, сглаживаем только текст
+        self.graphics_view.setRenderHint(QPainter.RenderHint.TextAntialiasing)
         self.graphics_view.setMinimumHeight(600)
         self.graphics_view.setMinimumWidth(600)
         
@@ -884,6 +1015,8 @@ class OptimizerWindow(QWidget):
         
         # Включаем обновление сцены только при необходимости
         self.graphics_view.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.SmartViewportUpdate)
+        # OpenGL-отрисовка (если включена в настройках визуализации)
+        setup_opengl_viewport(self.graphics_view)
         
         vis_main_layout.addWidget(self.graphics_view)
         vis_main_group.setLayout(vis_main_layout)
@@ -900,14 +1033,12 @@ class OptimizerWindow(QWidget):
         remnants_group = QGroupBox("Деловые остатки текущего листа")
         remnants_layout = QVBoxLayout(remnants_group)
         
-        self.current_remnants_table = QTableWidget(0, 4)
-        self.current_remnants_table.setHorizontalHeaderLabels([
-            'Артикул', 'Высота', 'Ширина', 'Кол-во'
-        ])
-        # Простая автоматическая настройка ширины столбцов
-        header = self.current_remnants_table.horizontalHeader()
-        header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
-        header.setStretchLastSection(True)  # Последний столбец растягивается
+        # Модель вместо QTableWidget: без QTableWidgetItem на каждую ячейку
+        self.current_remnants_model = RectTableModel(['Артикул', 'Высота', 'Ширина', 'Кол-во'])
+        self.current_remnants_table = QTableView()
+        self.current_remnants_table.setModel(self.current_remnants_model)
+        # Фиксированная ширина столбцов задается один раз - без пересчета по содержимому при смене листа
+        self._set_fixed_column_widths(self.current_remnants_table)
         self.current_remnants_table.setSortingEnabled(True)
         self.current_remnants_table.setMinimumHeight(200)
         remnants_layout.addWidget(self.current_remnants_table)
@@ -918,14 +1049,12 @@ class OptimizerWindow(QWidget):
         waste_group = QGroupBox("Отходы текущего листа")
         waste_layout = QVBoxLayout(waste_group)
         
-        self.waste_result_table = QTableWidget(0, 4)
-        self.waste_result_table.setHorizontalHeaderLabels([
-            'Артикул', 'Высота', 'Ширина', 'Кол-во'
-        ])
-        # Простая автоматическая настройка ширины столбцов
-        header = self.waste_result_table.horizontalHeader()
-        header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
-        header.setStretchLastSection(True)  # Последний столбец растягивается
+        # Модель вместо QTableWidget: без QTableWidgetItem на каждую ячейку
+        self.waste_result_model = RectTableModel(['Артикул', 'Высота', 'Ширина', 'Кол-во'])
+        self.waste_result_table = QTableView()
+        self.waste_result_table.setModel(self.waste_result_model)
+        # Фиксированная ширина столбцов задается один раз - без пересчета по содержимому при смене листа
+        self._set_fixed_column_widths(self.waste_result_table)
         self.waste_result_table.setSortingEnabled(True)
         self.waste_result_table.setMinimumHeight(200)
         waste_layout.addWidget(self.waste_result_table)
@@ -1136,6 +1265,7 @@ class OptimizerWindow(QWidget):
         self.zoom_slider.setTickPosition(QSlider.TicksBelow)
         self.zoom_slider.setMinimumWidth(150)
         self.zoom_slider.valueChanged.connect(self.on_zoom_changed)
+        self._init_zoom_debounce()
         self.zoom_slider.setToolTip("Масштаб: 10% (обзор) - 500% (детальный просмотр)\nИспользуйте колесико мыши для плавного зума")
         controls_layout.addWidget(self.zoom_slider)
         
@@ -1187,33 +1317,50 @@ class OptimizerWindow(QWidget):
         
         # Графическая сцена
         self.graphics_scene = QGraphicsScene()
+        setup_view_only_scene(self.graphics_scene)
+        # Отрисованные листы этой сцены: {(индекс листа, размеры, названия): (группа, прямоугольник листа)}
+        self.cached_drawings = {}
         
         # Используем кастомный вид с поддержкой зума
         self.graphics_view = ZoomableGraphicsView(self.graphics_scene, self)
-        self.graphics_view.setRenderHint(QPainter.Antialiasing)
+        # Сглаживание только для текста, как в основной вкладке визуализации
+        self.graphics_view.setRenderHint(QPainter.TextAntialiasing)
         self.graphics_view.setMinimumHeight(600)
         self.graphics_view.setDragMode(QGraphicsView.ScrollHandDrag)
         self.graphics_view.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
         self.graphics_view.setResizeAnchor(QGraphicsView.AnchorUnderMouse)
+        setup_opengl_viewport(self.graphics_view)
         
         layout.addWidget(self.graphics_view)
         
         vis_group.setLayout(layout)
         return vis_group
     
+    def _init_zoom_debounce(self):
+        """Таймер отложенного применения масштаба (серия событий слайдера - одна перестройка вида)"""
+        self._pending_zoom = self.zoom_slider.value()
+        self._zoom_debounce = QTimer(self)
+        self._zoom_debounce.setSingleShot(True)
+        self._zoom_debounce.timeout.connect(self._apply_zoom)
+    
     def on_zoom_changed(self, value):
         """Обработка изменения зума - улучшенная версия"""
-        scale = value / 100.0
-        
-        # Сброс трансформации и применение нового масштаба
-        self.graphics_view.resetTransform()
-        self.graphics_view.scale(scale, scale)
-        
         # Обновляем label
         self.zoom_label.setText(f"{value}%")
         
         # Сохраняем текущий масштаб для других операций
-        self.current_zoom_level = scale
+        self.current_zoom_level = value / 100.0
+        
+        # Трансформация применяется после паузы в событиях слайдера/колеса
+        self._pending_zoom = value
+        self._zoom_debounce.start(30)
+    
+    def _apply_zoom(self):
+        """Применение последнего запрошенного масштаба к виду"""
+        scale = self._pending_zoom / 100.0
+        
+        # Абсолютная трансформация одним вызовом (без промежуточного сброса к единичной матрице)
+        self.graphics_view.setTransform(QTransform.fromScale(scale, scale))
     
     def wheel_zoom(self, event):
         """Зум колесиком мыши - улучшенная версия с поддержкой Ctrl+колесико для прокрутки"""
@@ -1302,17 +1449,9 @@ class OptimizerWindow(QWidget):
         grid_step = 100  # размер ячейки сетки в мм
         grid_pen = QPen(QColor(180, 180, 180), 1, Qt.DotLine)
         
-        # Вертикальные линии
-        x = grid_step
-        while x < width:
-            self.graphics_scene.addLine(x * scale_factor, 0, x * scale_factor, height * scale_factor, grid_pen)
-            x += grid_step
-        
-        # Горизонтальные линии
-        y = grid_step
-        while y < height:
-            self.graphics_scene.addLine(0, y * scale_factor, width * scale_factor, y * scale_factor, grid_pen)
-            y += grid_step
+        # Все линии сетки одним элементом сцены
+        self.graphics_scene.addPath(
+            _grid_path(width * scale_factor, height * scale_factor, grid_step * scale_factor), grid_pen)
 
     def show_navigation_help(self):
         """Показ подсказок по навигации и зуму"""
@@ -1356,40 +1495,30 @@ class OptimizerWindow(QWidget):
 
     def update_remnants_table(self, sheet_layouts):
         """Обновление общей таблицы остатков (для всех листов)"""
-        if not hasattr(self, 'remnants_result_table'):
+        if not hasattr(self, 'remnants_result_model'):
             return
-        self.remnants_result_table.setRowCount(0)
+        
+        # Параметры остатков берем из снимка запуска, а не из виджетов на каждый прямоугольник
+        ctx = self._get_run_context()
+        param_min = ctx['pmin']
+        param_max = ctx['pmax']
         
         # Собираем все полезные остатки со всех листов
+        rows = []
         for sheet_idx, layout in enumerate(sheet_layouts):
+            # Артикул материала
+            marking = layout.sheet.material
             for rect in layout.free_rectangles:
                 if rect.width > 0 and rect.height > 0:
-                    # Проверяем минимальные размеры из параметров оптимизации
-                    min_width = self.min_remnant_width.value() if hasattr(self, 'min_remnant_width') else 180
-                    min_height = self.min_remnant_height.value() if hasattr(self, 'min_remnant_height') else 100
-                    
                     # Используем улучшенную логику: большая сторона >= большего параметра, меньшая >= меньшего
                     element_min_side = min(rect.width, rect.height)
                     element_max_side = max(rect.width, rect.height)
-                    param_min = min(min_width, min_height)
-                    param_max = max(min_width, min_height)
                     
                     if element_min_side >= param_min and element_max_side >= param_max:
-                        row = self.remnants_result_table.rowCount()
-                        self.remnants_result_table.insertRow(row)
-                        
-                        # Артикул материала
-                        marking = layout.sheet.material
-                        self.remnants_result_table.setItem(row, 0, QTableWidgetItem(marking))
-                        
-                        # Высота
-                        self.remnants_result_table.setItem(row, 1, QTableWidgetItem(f"{rect.height:.0f}"))
-                        
-                        # Ширина
-                        self.remnants_result_table.setItem(row, 2, QTableWidgetItem(f"{rect.width:.0f}"))
-                        
-                        # Количество (всегда 1)
-                        self.remnants_result_table.setItem(row, 3, QTableWidgetItem("1"))
+                        # Количество всегда 1
+                        rows.append((marking, rect.height, rect.width, 1))
+        
+        self.remnants_result_model.set_rows(rows)
 
     # ========== МЕТОДЫ ЗАГРУЗКИ ДАННЫХ ==========
     
@@ -1398,20 +1527,31 @@ class OptimizerWindow(QWidget):
         try:
             header = table.horizontalHeader()
             # Переключаем все столбцы в интерактивный режим, кроме последнего
-            for i in range(table.columnCount() - 1):
+            # model() есть и у QTableWidget, и у QTableView
+            column_count = table.model().columnCount()
+            for i in range(column_count - 1):
                 header.setSectionResizeMode(i, QHeaderView.ResizeMode.Interactive)
             # Последний столбец остается растягивающимся
-            if table.columnCount() > 0:
-                header.setSectionResizeMode(table.columnCount() - 1, QHeaderView.ResizeMode.Stretch)
+            if column_count > 0:
+                header.setSectionResizeMode(column_count - 1, QHeaderView.ResizeMode.Stretch)
         except Exception as e:
             print(f"⚠️ Ошибка настройки интерактивного режима таблицы: {e}")
     
+    def _set_fixed_column_widths(self, table, widths=(220, 90, 90)):
+        """Однократная настройка ширины столбцов таблиц текущего листа (Артикул/Высота/Ширина/Кол-во)"""
+        header = table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        for col, width in enumerate(widths):
+            header.resizeSection(col, width)
+        # Последний столбец (Кол-во) растягивается на оставшееся место
+        header.setStretchLastSection(True)
+    
     def _update_table_column_widths(self, table):
         """Обновление ширины столбцов таблицы после заполнения данными"""
         try:
             header = table.horizontalHeader()
             # Временно переключаем в режим подгонки по содержимому
-            for i in range(table.columnCount()):
+            for i in range(table.model().columnCount()):
                 header.setSectionResizeMode(i, QHeaderView.ResizeMode.ResizeToContents)
             
             # Обрабатываем события Qt для пересчета размеров
@@ -1429,15 +1569,14 @@ class OptimizerWindow(QWidget):
             'remainders_table', 
             'materials_table',
             'remnants_result_table',
-            'waste_results_table',
-            'current_remnants_table',
-            'waste_result_table'
+            'waste_results_table'
         ]
+        # current_remnants_table и waste_result_table имеют фиксированную ширину столбцов
         
         for table_name in table_names:
             if hasattr(self, table_name):
                 table = getattr(self, table_name)
-                if table and table.rowCount() > 0:  # Обновляем только заполненные таблицы
+                if table and table.model().rowCount() > 0:  # Обновляем только заполненные таблицы
                     table.resizeColumnsToContents()
     
     def on_load_data_clicked(self):
@@ -1672,6 +1811,19 @@ class OptimizerWindow(QWidget):
             self.prev_sheet_btn.setEnabled(False)
             self.next_sheet_btn.setEnabled(False)
     
+    def _get_run_context(self):
+        """Снимок параметров остатков на момент запуска (снимается в _handle_optimization_result)"""
+        if self._run_context is None:
+            min_width = self.min_remnant_width.value() if hasattr(self, 'min_remnant_width') else 180
+            min_height = self.min_remnant_height.value() if hasattr(self, 'min_remnant_height') else 100
+            self._run_context = {
+                'min_remnant_width': min_width,
+                'min_remnant_height': min_height,
+                'pmin': min(min_width, min_height),
+                'pmax': max(min_width, min_height),
+            }
+        return self._run_context
+
     def refresh_visualization(self):
         """Обновление визуализации"""
         if self.optimization_result and self.current_sheet_index >= 0:
@@ -1697,7 +1849,9 @@ class OptimizerWindow(QWidget):
             sheet_layout,
             show_grid=show_grid,
             show_dimensions=show_dimensions,
-            show_names=show_names
+            show_names=show_names,
+            cached_drawings=self.cached_drawings,
+            cache_key=(sheet_index, show_dimensions, show_names)
         )
         
         if sheet_rect:
@@ -1729,101 +1883,51 @@ class OptimizerWindow(QWidget):
 
     def update_current_remnants_table(self, sheet_layout):
         """Обновление таблицы деловых остатков для текущего листа"""
-        if not hasattr(self, 'current_remnants_table'):
+        if not hasattr(self, 'current_remnants_model'):
             return
         
-        # Временно отключаем сортировку
-        sorting_enabled = self.current_remnants_table.isSortingEnabled()
-        self.current_remnants_table.setSortingEnabled(False)
-        
-        # Очищаем таблицу
-        self.current_remnants_table.setRowCount(0)
+        rows = []
+        marking = sheet_layout.sheet.material
         
         # Добавляем все полезные остатки текущего листа используя параметры оптимизации
         if hasattr(sheet_layout, 'free_rectangles') and sheet_layout.free_rectangles:
+            ctx = self._get_run_context()
+            param_min = ctx['pmin']
+            param_max = ctx['pmax']
+            
             for i, rect in enumerate(sheet_layout.free_rectangles):
                 try:
                     # ИСПРАВЛЕНО: Проверяем что rect это объект FreeRectangle с атрибутами
                     if hasattr(rect, 'width') and hasattr(rect, 'height'):
-                        if rect.width > 0 and rect.height > 0:
-                            # Используем улучшенную логику: большая сторона >= большего параметра, меньшая >= меньшего
-                            min_width = self.min_remnant_width.value() if hasattr(self, 'min_remnant_width') else 180
-                            min_height = self.min_remnant_height.value() if hasattr(self, 'min_remnant_height') else 100
-                            element_min_side = min(rect.width, rect.height)
-                            element_max_side = max(rect.width, rect.height)
-                            param_min = min(min_width, min_height)
-                            param_max = max(min_width, min_height)
-                            
-                            if element_min_side >= param_min and element_max_side >= param_max:
-                                row = self.current_remnants_table.rowCount()
-                                self.current_remnants_table.insertRow(row)
-                                
-                                # Артикул
-                                marking = sheet_layout.sheet.material
-                                self.current_remnants_table.setItem(row, 0, _create_text_item(marking))
-                                
-                                # Высота
-                                self.current_remnants_table.setItem(row, 1, _create_numeric_item(rect.height))
-                                
-                                # Ширина  
-                                self.current_remnants_table.setItem(row, 2, _create_numeric_item(rect.width))
-                                
-                                # Количество (всегда 1 для остатков)
-                                self.current_remnants_table.setItem(row, 3, _create_numeric_item(1))
-                    
+                        width, height = rect.width, rect.height
                     # ИСПРАВЛЕНО: Обработка случая когда rect это словарь (для совместимости)
                     elif isinstance(rect, dict):
-                        if rect.get('width', 0) > 0 and rect.get('height', 0) > 0:
-                            # Проверяем минимальные размеры
-                            min_width = self.min_remnant_width.value() if hasattr(self, 'min_remnant_width') else 180
-                            min_height = self.min_remnant_height.value() if hasattr(self, 'min_remnant_height') else 100
-                            element_min_side = min(rect['width'], rect['height'])
-                            element_max_side = max(rect['width'], rect['height'])
-                            param_min = min(min_width, min_height)
-                            param_max = max(min_width, min_height)
-                            
-                            if element_min_side >= param_min and element_max_side >= param_max:
-                                row = self.current_remnants_table.rowCount()
-                                self.current_remnants_table.insertRow(row)
-                                
-                                # Артикул
-                                marking = sheet_layout.sheet.material
-                                self.current_remnants_table.setItem(row, 0, _create_text_item(marking))
-                                
-                                # Высота
-                                self.current_remnants_table.setItem(row, 1, _create_numeric_item(rect.get('height', 0)))
-                                
-                                # Ширина  
-                                self.current_remnants_table.setItem(row, 2, _create_numeric_item(rect.get('width', 0)))
-                                
-                                # Количество (всегда 1 для остатков)
-                                self.current_remnants_table.setItem(row, 3, _create_numeric_item(1))
-                    
+                        width, height = rect.get('width', 0), rect.get('height', 0)
                     else:
                         logger.warning(f"Неизвестный формат free_rectangle: {type(rect)}")
+                        continue
+                    
+                    if width > 0 and height > 0:
+                        # Используем улучшенную логику: большая сторона >= большего параметра, меньшая >= меньшего
+                        if min(width, height) >= param_min and max(width, height) >= param_max:
+                            # Количество всегда 1 для остатков
+                            rows.append((marking, height, width, 1))
                         
                 except Exception as e:
                     logger.error(f"Ошибка обработки остатка {i}: {e}")
                     continue
         
-        # Восстанавливаем сортировку
-        self.current_remnants_table.setSortingEnabled(sorting_enabled)
-        
-        # Простое обновление размеров столбцов
-        self.current_remnants_table.resizeColumnsToContents()
+        # Одна замена строк модели вместо setItem на каждую ячейку
+        self.current_remnants_model.set_rows(rows)
 
     def update_waste_table(self, sheet_layout):
         """Обновление таблицы отходов для текущего листа"""
         # ИСПРАВЛЕНО: Используем таблицу из вкладки визуализации, а не результатов
-        if not hasattr(self, 'waste_result_table'):
+        if not hasattr(self, 'waste_result_model'):
             return
         
-        # Временно отключаем сортировку
-        sorting_enabled = self.waste_result_table.isSortingEnabled()
-        self.waste_result_table.setSortingEnabled(False)
-        
-        # Очищаем таблицу
-        self.waste_result_table.setRowCount(0)
+        rows = []
+        marking = sheet_layout.sheet.material
         
         # Добавляем все отходные прямоугольники текущего листа
         if hasattr(sheet_layout, 'waste_rectangles') and sheet_layout.waste_rectangles:
@@ -1831,54 +1935,24 @@ class OptimizerWindow(QWidget):
                 try:
                     # ИСПРАВЛЕНО: Проверяем что waste_rect это объект FreeRectangle с атрибутами
                     if hasattr(waste_rect, 'width') and hasattr(waste_rect, 'height'):
-                        if waste_rect.width > 0 and waste_rect.height > 0:
-                            row = self.waste_result_table.rowCount()
-                            self.waste_result_table.insertRow(row)
-                            
-                            # Артикул
-                            marking = sheet_layout.sheet.material
-                            self.waste_result_table.setItem(row, 0, _create_text_item(marking))
-                            
-                            # Высота
-                            self.waste_result_table.setItem(row, 1, _create_numeric_item(waste_rect.height))
-                            
-                            # Ширина
-                            self.waste_result_table.setItem(row, 2, _create_numeric_item(waste_rect.width))
-                            
-                            # Количество (всегда 1 для отходов)
-                            self.waste_result_table.setItem(row, 3, _create_numeric_item(1))
-                    
+                        width, height = waste_rect.width, waste_rect.height
                     # ИСПРАВЛЕНО: Обработка случая когда waste_rect это словарь (для совместимости)
                     elif isinstance(waste_rect, dict):
-                        if waste_rect.get('width', 0) > 0 and waste_rect.get('height', 0) > 0:
-                            row = self.waste_result_table.rowCount()
-                            self.waste_result_table.insertRow(row)
-                            
-                            # Артикул
-                            marking = sheet_layout.sheet.material
-                            self.waste_result_table.setItem(row, 0, _create_text_item(marking))
-                            
-                            # Высота
-                            self.waste_result_table.setItem(row, 1, _create_numeric_item(waste_rect.get('height', 0)))
-                            
-                            # Ширина
-                            self.waste_result_table.setItem(row, 2, _create_numeric_item(waste_rect.get('width', 0)))
-                            
-                            # Количество (всегда 1 для отходов)
-                            self.waste_result_table.setItem(row, 3, _create_numeric_item(1))
-                    
+                        width, height = waste_rect.get('width', 0), waste_rect.get('height', 0)
                     else:
                         logger.warning(f"Неизвестный формат waste_rect: {type(waste_rect)}")
+                        continue
+                    
+                    if width > 0 and height > 0:
+                        # Количество всегда 1 для отходов
+                        rows.append((marking, height, width, 1))
                         
                 except Exception as e:
                     logger.error(f"Ошибка обработки отхода {i}: {e}")
                     continue
         
-        # Восстанавливаем сортировку
-        self.waste_result_table.setSortingEnabled(sorting_enabled)
-        
-        # Простое обновление размеров столбцов
-        self.waste_result_table.resizeColumnsToContents()
+        # Одна замена строк модели вместо setItem на каждую ячейку
+        self.waste_result_model.set_rows(rows)
 
     # ========== ВСПОМОГАТЕЛЬНЫЕ МЕТОДЫ ==========
     
@@ -1964,48 +2038,54 @@ class OptimizerWindow(QWidget):
     
     def _update_details_table(self, details):
         """Обновление таблицы деталей"""
-        self.details_table.setRowCount(0)
-        for detail in details:
-            row = self.details_table.rowCount()
-            self.details_table.insertRow(row)
-            
-            self.details_table.setItem(row, 0, _create_text_item(detail.get('oi_name', '')))
-            self.details_table.setItem(row, 1, _create_text_item(detail.get('g_marking', '')))
-            self.details_table.setItem(row, 2, _create_numeric_item(detail.get('height', 0)))
-            self.details_table.setItem(row, 3, _create_numeric_item(detail.get('width', 0)))
-            self.details_table.setItem(row, 4, _create_numeric_item(detail.get('total_qty', 0)))
+        table = self.details_table
+        with _bulk_table_update(table):
+            # Число строк задается один раз вместо insertRow на каждую деталь
+            table.setRowCount(len(details))
+            for row, detail in enumerate(details):
+                table.setItem(row, 0, _create_text_item(detail.get('oi_name', '')))
+                table.setItem(row, 1, _create_text_item(detail.get('g_marking', '')))
+                table.setItem(row, 2, _create_numeric_item(detail.get('height', 0)))
+                table.setItem(row, 3, _create_numeric_item(detail.get('width', 0)))
+                table.setItem(row, 4, _create_numeric_item(detail.get('total_qty', 0)))
     
     def _update_remainders_table(self, remainders):
         """Обновление таблицы остатков"""
-        self.remainders_table.setRowCount(0)
-        for remainder in remainders:
-            if remainder.get('qty', 0) > 0:  # Показываем только доступные остатки
-                row = self.remainders_table.rowCount()
-                self.remainders_table.insertRow(row)
-                
-                self.remainders_table.setItem(row, 0, _create_text_item(remainder.get('g_marking', '')))
-                self.remainders_table.setItem(row, 1, _create_numeric_item(remainder.get('height', 0)))
-                self.remainders_table.setItem(row, 2, _create_numeric_item(remainder.get('width', 0)))
-                self.remainders_table.setItem(row, 3, _create_numeric_item(remainder.get('qty', 0)))
+        # Показываем только доступные остатки
+        available = [remainder for remainder in remainders if remainder.get('qty', 0) > 0]
+        table = self.remainders_table
+        with _bulk_table_update(table):
+            table.setRowCount(len(available))
+            for row, remainder in enumerate(available):
+                table.setItem(row, 0, _create_text_item(remainder.get('g_marking', '')))
+                table.setItem(row, 1, _create_numeric_item(remainder.get('height', 0)))
+                table.setItem(row, 2, _create_numeric_item(remainder.get('width', 0)))
+                table.setItem(row, 3, _create_numeric_item(remainder.get('qty', 0)))
     
     def _update_materials_table(self, materials):
         """Обновление таблицы материалов"""
-        self.materials_table.setRowCount(0)
+        available = []
         for material in materials:
             # Проверяем оба поля: res_qty (для API данных) и qty (для отладочных данных)
             res_qty = material.get('res_qty', 0) or material.get('qty', 0)
             if res_qty and res_qty > 0:  # Показываем только доступные материалы
-                row = self.materials_table.rowCount()
-                self.materials_table.insertRow(row)
-                
-                self.materials_table.setItem(row, 0, _create_text_item(material.get('g_marking', '')))
-                self.materials_table.setItem(row, 1, _create_numeric_item(material.get('height', 0)))
-                self.materials_table.setItem(row, 2, _create_numeric_item(material.get('width', 0)))
-                self.materials_table.setItem(row, 3, _create_numeric_item(int(res_qty)))
+                available.append((material, res_qty))
+        
+        table = self.materials_table
+        with _bulk_table_update(table):
+            table.setRowCount(len(available))
+            for row, (material, res_qty) in enumerate(available):
+                table.setItem(row, 0, _create_text_item(material.get('g_marking', '')))
+                table.setItem(row, 1, _create_numeric_item(material.get('height', 0)))
+                table.setItem(row, 2, _create_numeric_item(material.get('width', 0)))
+                table.setItem(row, 3, _create_numeric_item(int(res_qty)))
     
     def _handle_optimization_result(self, result):
         """Обработка результата оптимизации"""
         self.optimization_result = result
+        # Снимаем параметры остатков один раз на весь запуск
+        self._run_context = None
+        self._get_run_context()
         
         # Восстанавливаем кнопку
         self.optimize_button.setEnabled(True)
@@ -2139,16 +2219,15 @@ class OptimizerWindow(QWidget):
         
         # ИСПРАВЛЕНО: Подсчитываем количество записей в таблице деловых остатков (сгруппированных)
         remnants_grouped = {}
+        ctx = self._get_run_context()
+        param_min = ctx['pmin']
+        param_max = ctx['pmax']
         for layout in result.sheets:
             g_marking = layout.sheet.material
             for rect in layout.free_rectangles:
                 # Используем ту же логику что и в таблице
-                min_width = self.min_remnant_width.value() if hasattr(self, 'min_remnant_width') else 180
-                min_height = self.min_remnant_height.value() if hasattr(self, 'min_remnant_height') else 100
                 element_min_side = min(rect.width, rect.height)
                 element_max_side = max(rect.width, rect.height)
-                param_min = min(min_width, min_height)
-                param_max = max(min_width, min_height)
                 
                 if element_min_side >= param_min and element_max_side >= param_max:
                     key = (g_marking, rect.width, rect.height)
@@ -2176,9 +2255,8 @@ class OptimizerWindow(QWidget):
         try:
             # Обновляем таблицу деловых остатков на вкладке "Результаты оптимизации"
             if hasattr(self, 'remnants_result_table'):
-                min_width = self.min_remnant_width.value() if hasattr(self, 'min_remnant_width') else 180
-                min_height = self.min_remnant_height.value() if hasattr(self, 'min_remnant_height') else 100
-                update_remnants_result_table(self.remnants_result_table, result, min_width, min_height)
+                update_remnants_result_table(self.remnants_result_table, result,
+                                             ctx['min_remnant_width'], ctx['min_remnant_height'])
                 
             # Обновляем таблицу отходов на вкладке "Результаты оптимизации"
             if hasattr(self, 'waste_results_table'):
@@ -2194,7 +2272,12 @@ class OptimizerWindow(QWidget):
     
     def _update_visualization(self, result):
         """Обновление визуализации"""
-        # Очищаем и заполняем выпадающий список листов
+        # Новый результат - ранее отрисованные листы больше не актуальны
+        self.cached_drawings = {}
+        
+        # Очищаем и заполняем выпадающий список листов. Сигналы заблокированы: clear/addItem/setCurrentIndex
+        # не вызывают on_sheet_selected, первый лист строится один раз явным вызовом ниже
+        self.sheets_combo.blockSignals(True)
         self.sheets_combo.clear()
         for i, layout in enumerate(result.sheets):
             sheet = layout.sheet
@@ -2202,13 +2285,15 @@ class OptimizerWindow(QWidget):
             if sheet.is_remainder:
                 label += " [Остаток]"
             self.sheets_combo.addItem(label)
+        if result.sheets:
+            self.sheets_combo.setCurrentIndex(0)
+        self.sheets_combo.blockSignals(False)
         
         # Устанавливаем флаг первой визуализации
         self._first_visualization = True
         
         # Выбираем первый лист
         if result.sheets:
-            self.sheets_combo.setCurrentIndex(0)
             self.current_sheet_index = 0
             self.visualize_sheet(0)
             self.update_navigation_buttons()
@@ -2256,24 +2341,9 @@ class OptimizerWindow(QWidget):
             adjust_materials = self.adjust_materials_checkbox.isChecked()
             print(f"🔧 Корректировка списания материалов: {'ВКЛЮЧЕНА' if adjust_materials else 'ОТКЛЮЧЕНА'}")
             
-            # Импортируем функции для работы с API - исправляем относительный импорт
-            import sys
-            import os
-            
-            # Добавляем корневую папку проекта в путь
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            parent_dir = os.path.dirname(current_dir)  # client directory
-            if parent_dir not in sys.path:
-                sys.path.insert(0, parent_dir)
-            
-            try:
-                from core.api_client import upload_optimization_data, check_api_connection
-            except ImportError:
-                # Альтернативный способ импорта
-                from client.core.api_client import upload_optimization_data, check_api_connection
-            
-            # Проверяем доступность API
-            if not check_api_connection():
+            # Проверяем доступность API (после успешной загрузки в этой сессии проверку пропускаем -
+            # ошибку подключения все равно вернет сам запрос загрузки)
+            if not self._last_upload_ok and not check_api_connection():
                 raise Exception("API сервер недоступен. Проверьте подключение.")
             
             # Подготавливаем данные для загрузки
@@ -2318,6 +2388,7 @@ class OptimizerWindow(QWidget):
             
             if result.get('success'):
                 print(f"✅ Данные успешно загружены в Altawin!")
+                self._last_upload_ok = True
                 
                 # Формируем сообщение об успехе с учетом корректировки материалов
                 success_message = f"✅ Данные оптимизации успешно загружены в Altawin!\n\n"
@@ -2337,6 +2408,7 @@ class OptimizerWindow(QWidget):
                     success_message
                 )
             else:
+                self._last_upload_ok = False
                 error_msg = result.get('message', 'Неизвестная ошибка')
                 raise Exception(f"Ошибка загрузки: {error_msg}")
                 
@@ -2359,103 +2431,130 @@ class OptimizerWindow(QWidget):
     
     def _prepare_optimization_data_for_upload(self):
         """Подготовка данных оптимизации для загрузки в Altawin"""
-        optimization_data = []
-        
         print(f"🔧 CLIENT: Начинаем подготовку данных для загрузки. Количество листов: {len(self.optimization_result.sheets)}")
         
-        for sheet_index, sheet_layout in enumerate(self.optimization_result.sheets):
+        # Индекс артикул -> goodsid строится один раз на все листы
+        goodsid_index = self._build_goodsid_index()
+        
+        optimization_data = [
+            self._build_sheet_payload(sheet_index, sheet_layout, goodsid_index)
+            for sheet_index, sheet_layout in enumerate(self.optimization_result.sheets)
+        ]
+        
+        # Итоговая статистика
+        total_remainder_sheets = sum(1 for sheet in optimization_data if sheet['is_remainder'] == 1)
+        print(f"📊 CLIENT: Итоги подготовки данных:")
+        print(f"   - Всего листов: {len(optimization_data)}")
+        print(f"   - Листов с деловыми остатками: {total_remainder_sheets}")
+        
+        return optimization_data
+    
+    def _build_sheet_payload(self, sheet_index, sheet_layout, goodsid_index):
+        """Сборка данных одного листа (XML, goodsid, остатки) для загрузки в Altawin"""
+        # Получаем goodsid для листа (результат запоминается в sheet.goodsid и переиспользуется в XML)
+        goodsid = self._extract_goodsid_from_sheet(sheet_layout, goodsid_index)
+        
+        # XML - чистая функция раскладки листа и параметров остатков: при повторной загрузке берем из кэша
+        xml_key = self._xml_fingerprint(sheet_layout, goodsid)
+        xml_data = self._xml_cache.get(xml_key)
+        if xml_data is None:
             # Создаем XML данные
             xml_data = self._create_cutting_xml(sheet_layout, sheet_index + 1)
             
             # Исправляем логику размеров в XML (на случай если есть старые ошибки)
             xml_data = self.fix_xml_dimensions_logic(xml_data)
             
-            print(f"📄 XML для листа {sheet_index + 1}: {len(xml_data)} символов, кодировка UTF-8")
-            
-            # Получаем goodsid для листа
-            goodsid = self._extract_goodsid_from_sheet(sheet_layout)
-            
-            # Получаем amfactor для товара
-            amfactor = self._get_amfactor_for_goodsid(goodsid)
-            
-            # Рассчитываем qty: количество листов (для OPTDATA)
-            qty = 1  # Количество листов
-            
-            print(f"🔧 Лист {sheet_index + 1}: goodsid={goodsid}, amfactor={amfactor}")
-            print(f"🔧 Лист {sheet_index + 1}: qty={qty} (листов)")
-            print(f"🔧 Лист {sheet_index + 1}: is_remainder={sheet_layout.sheet.is_remainder}, материал={sheet_layout.sheet.material}")
-            
-            # Подсчитываем деловые остатки на этом листе
-            remnants_on_sheet = [item for item in sheet_layout.placed_items if item.item_type == "remnant"]
-            print(f"🔧 Лист {sheet_index + 1}: найдено {len(remnants_on_sheet)} деловых остатков")
-            for i, remnant in enumerate(remnants_on_sheet):
-                print(f"   - Остаток {i+1}: {remnant.width:.0f}x{remnant.height:.0f}")
-            
-            # Собираем данные о полученных деловых остатках (free_rectangles)
-            free_rectangles_data = []
-            if hasattr(sheet_layout, 'free_rectangles') and sheet_layout.free_rectangles:
-                min_width = self.min_remnant_width.value() if hasattr(self, 'min_remnant_width') else 180
-                min_height = self.min_remnant_height.value() if hasattr(self, 'min_remnant_height') else 100
-                
-                for rect in sheet_layout.free_rectangles:
-                    try:
-                        if hasattr(rect, 'width') and hasattr(rect, 'height'):
-                            # Используем ту же логику что и в таблице остатков
-                            element_min_side = min(rect.width, rect.height)
-                            element_max_side = max(rect.width, rect.height)
-                            param_min = min(min_width, min_height)
-                            param_max = max(min_width, min_height)
-                            
-                            if element_min_side >= param_min and element_max_side >= param_max:
-                                free_rectangles_data.append({
-                                    'width': int(rect.width),
-                                    'height': int(rect.height),
-                                    'area': int(rect.width * rect.height)
-                                })
-                    except Exception as e:
-                        print(f"⚠️ Ошибка обработки free_rectangle: {e}")
-                        continue
-            
-            print(f"🔧 Лист {sheet_index + 1}: найдено {len(free_rectangles_data)} полезных деловых остатков")
-            
-            # Собираем данные о листе
-            sheet_data = {
-                'num_glass': sheet_index + 1,  # Порядковый номер листа
-                'goodsid': goodsid,
-                'width': int(sheet_layout.sheet.width),
-                'height': int(sheet_layout.sheet.height),
-                'trash_area': int(sheet_layout.waste_area),
-                'percent_full': round(sheet_layout.efficiency, 6),
-                'percent_waste': round(sheet_layout.waste_percent, 6),
-                'piece_count': len(sheet_layout.placed_details),
-                'sum_area': int(sheet_layout.used_area),
-                'qty': qty,  # Количество листов (для OPTDATA)
-                'amfactor': amfactor,  # amfactor как отдельный параметр
-                'is_remainder': 1 if sheet_layout.sheet.is_remainder else 0,
-                'free_rectangles': free_rectangles_data,  # Данные о полученных деловых остатках
-                'xml_data': xml_data  # XML данные в правильной кодировке UTF-8
-            }
-            
-            print(f"📋 Клиент: Подготовлен лист {sheet_index + 1}:")
-            print(f"   - goodsid: {goodsid}")
-            print(f"   - is_remainder: {sheet_data['is_remainder']}")
-            print(f"   - размеры: {sheet_data['width']}x{sheet_data['height']}")
-            print(f"   - qty: {qty} (листов)")
-            print(f"   - amfactor: {amfactor}")
-            print(f"   - материал: {sheet_layout.sheet.material}")
-            print(f"   - деловых остатков на листе: {len(remnants_on_sheet)}")
+            if len(self._xml_cache) >= _XML_CACHE_MAX:
+                # FIFO: словарь хранит порядок вставки, первый ключ - самый старый
+                del self._xml_cache[next(iter(self._xml_cache))]
+            self._xml_cache[xml_key] = xml_data
+        else:
+            print(f"♻️ XML для листа {sheet_index + 1} взят из кэша")
+        
+        print(f"📄 XML для листа {sheet_index + 1}: {len(xml_data)} символов, кодировка UTF-8")
+        
+        # Получаем amfactor для товара
+        amfactor = self._get_amfactor_for_goodsid(goodsid)
+        
+        # Рассчитываем qty: количество листов (для OPTDATA)
+        qty = 1  # Количество листов
+        
+        print(f"🔧 Лист {sheet_index + 1}: goodsid={goodsid}, amfactor={amfactor}")
+        print(f"🔧 Лист {sheet_index + 1}: qty={qty} (листов)")
+        print(f"🔧 Лист {sheet_index + 1}: is_remainder={sheet_layout.sheet.is_remainder}, материал={sheet_layout.sheet.material}")
+        
+        # Подсчитываем деловые остатки на этом листе
+        remnants_on_sheet = [item for item in sheet_layout.placed_items if item.item_type == "remnant"]
+        print(f"🔧 Лист {sheet_index + 1}: найдено {len(remnants_on_sheet)} деловых остатков")
+        for i, remnant in enumerate(remnants_on_sheet):
+            print(f"   - Остаток {i+1}: {remnant.width:.0f}x{remnant.height:.0f}")
+        
+        # Собираем данные о полученных деловых остатках (free_rectangles)
+        free_rectangles_data = []
+        if hasattr(sheet_layout, 'free_rectangles') and sheet_layout.free_rectangles:
+            ctx = self._get_run_context()
+            param_min = ctx['pmin']
+            param_max = ctx['pmax']
             
-            optimization_data.append(sheet_data)
+            for rect in sheet_layout.free_rectangles:
+                try:
+                    if hasattr(rect, 'width') and hasattr(rect, 'height'):
+                        # Используем ту же логику что и в таблице остатков
+                        element_min_side = min(rect.width, rect.height)
+                        element_max_side = max(rect.width, rect.height)
+                        
+                        if element_min_side >= param_min and element_max_side >= param_max:
+                            free_rectangles_data.append({
+                                'width': int(rect.width),
+                                'height': int(rect.height),
+                                'area': int(rect.width * rect.height)
+                            })
+                except Exception as e:
+                    print(f"⚠️ Ошибка обработки free_rectangle: {e}")
+                    continue
         
-        # Итоговая статистика
-        total_remainder_sheets = sum(1 for sheet in optimization_data if sheet['is_remainder'] == 1)
-        print(f"📊 CLIENT: Итоги подготовки данных:")
-        print(f"   - Всего листов: {len(optimization_data)}")
-        print(f"   - Листов с деловыми остатками: {total_remainder_sheets}")
+        print(f"🔧 Лист {sheet_index + 1}: найдено {len(free_rectangles_data)} полезных деловых остатков")
+        
+        # Собираем данные о листе
+        sheet_data = {
+            'num_glass': sheet_index + 1,  # Порядковый номер листа
+            'goodsid': goodsid,
+            'width': int(sheet_layout.sheet.width),
+            'height': int(sheet_layout.sheet.height),
+            'trash_area': int(sheet_layout.waste_area),
+            'percent_full': round(sheet_layout.efficiency, 6),
+            'percent_waste': round(sheet_layout.waste_percent, 6),
+            'piece_count': len(sheet_layout.placed_details),
+            'sum_area': int(sheet_layout.used_area),
+            'qty': qty,  # Количество листов (для OPTDATA)
+            'amfactor': amfactor,  # amfactor как отдельный параметр
+            'is_remainder': 1 if sheet_layout.sheet.is_remainder else 0,
+            'free_rectangles': free_rectangles_data,  # Данные о полученных деловых остатках
+            'xml_data': xml_data  # XML данные в правильной кодировке UTF-8
+        }
         
-        return optimization_data
+        print(f"📋 Клиент: Подготовлен лист {sheet_index + 1}:")
+        print(f"   - goodsid: {goodsid}")
+        print(f"   - is_remainder: {sheet_data['is_remainder']}")
+        print(f"   - размеры: {sheet_data['width']}x{sheet_data['height']}")
+        print(f"   - qty: {qty} (листов)")
+        print(f"   - amfactor: {amfactor}")
+        print(f"   - материал: {sheet_layout.sheet.material}")
+        print(f"   - деловых остатков на листе: {len(remnants_on_sheet)}")
+        
+        return sheet_data
     
-    def _extract_goodsid_from_sheet(self, sheet_layout):
+    def _build_goodsid_index(self):
+        """Индекс артикул -> goodsid (приоритет: материалы, затем остатки, затем детали)"""
+        goodsid_index = {}
+        for source in (self.current_materials, self.current_remainders, self.current_details):
+            for item in source or []:
+                goodsid = item.get('goodsid')
+                if goodsid:
+                    goodsid_index.setdefault(item.get('g_marking'), goodsid)
+        return goodsid_index
+
+    def _extract_goodsid_from_sheet(self, sheet_layout, goodsid_index=None):
         """Извлекает goodsid из листа оптимизации"""
         # Способ 1: Используем goodsid из атрибутов листа, если есть
         if hasattr(sheet_layout.sheet, 'goodsid') and sheet_layout.sheet.goodsid:
@@ -2470,36 +2569,19 @@ class OptimizerWindow(QWidget):
                         print(f"🔍 Найден goodsid в детали: {placed_detail.detail.goodsid}")
                         return placed_detail.detail.goodsid
         
-        # Способ 3: Ищем в загруженных материалах по артикулу (g_marking)
+        # Способ 3: Ищем в загруженных материалах, остатках и деталях по артикулу (g_marking)
         material_marking = sheet_layout.sheet.material
         print(f"🔍 Ищем goodsid для материала: {material_marking}")
         
-        # Ищем среди основных материалов
-        if hasattr(self, 'current_materials') and self.current_materials:
-            for material in self.current_materials:
-                if material.get('g_marking') == material_marking:
-                    goodsid = material.get('goodsid')
-                    if goodsid:
-                        print(f"✅ Найден goodsid в материалах: {goodsid}")
-                        return goodsid
+        if goodsid_index is None:
+            goodsid_index = self._build_goodsid_index()
         
-        # Ищем среди остатков
-        if hasattr(self, 'current_remainders') and self.current_remainders:
-            for remainder in self.current_remainders:
-                if remainder.get('g_marking') == material_marking:
-                    goodsid = remainder.get('goodsid')
-                    if goodsid:
-                        print(f"✅ Найден goodsid в остатках: {goodsid}")
-                        return goodsid
-        
-        # Способ 4: Ищем в исходных деталях
-        if hasattr(self, 'current_details') and self.current_details:
-            for detail in self.current_details:
-                if detail.get('g_marking') == material_marking:
-                    goodsid = detail.get('goodsid')
-                    if goodsid:
-                        print(f"✅ Найден goodsid в деталях: {goodsid}")
-                        return goodsid
+        goodsid = goodsid_index.get(material_marking)
+        if goodsid:
+            print(f"✅ Найден goodsid по артикулу: {goodsid}")
+            # Запоминаем в листе, чтобы повторные вызовы сразу шли по способу 1
+            sheet_layout.sheet.goodsid = goodsid
+            return goodsid
         
         # Если ничего не найдено - это критическая ошибка
         error_msg = f"❌ КРИТИЧЕСКАЯ ОШИБКА: Не удалось найти goodsid для материала '{material_marking}'"
@@ -2532,210 +2614,92 @@ class OptimizerWindow(QWidget):
         print(f"⚠️ amfactor не найден для goodsid={goodsid}, используем 1.0")
         return 1.0
     
+    def _xml_fingerprint(self, sheet_layout, goodsid):
+        """Отпечаток листа для кэша XML: все, от чего зависит содержимое XML раскроя"""
+        ctx = self._get_run_context()
+        sheet = sheet_layout.sheet
+        items = tuple(
+            (item.x, item.y, item.width, item.height, item.item_type, item.is_rotated,
+             None if item.detail is None else (
+                 item.detail.width, item.detail.height, item.detail.oi_name,
+                 getattr(item.detail, 'gp_marking', None), getattr(item.detail, 'orderno', None)))
+            for item in sheet_layout.placed_items
+        )
+        return (sheet.width, sheet.height, sheet.material, sheet.is_remainder, items, goodsid,
+                ctx['min_remnant_width'], ctx['min_remnant_height'])
+
     def _create_cutting_xml(self, sheet_layout, sheet_num):
-        """Создание XML файла раскроя в UTF-8 кодировке"""
-        from xml.etree.ElementTree import Element, SubElement, tostring
-        from xml.dom import minidom
-        
-        # Корневой элемент
-        cutting = Element("cutting")
-        cutting.set("version", "2.1")
-        
-        # Заголовок
-        header = SubElement(cutting, "header")
-        
-        # Информация о листе
-        glass = SubElement(header, "glass")
-        glass.set("id", str(self._extract_goodsid_from_sheet(sheet_layout)))
-        glass.set("width", str(int(sheet_layout.sheet.width)))
-        glass.set("height", str(int(sheet_layout.sheet.height)))
-        glass.set("remainder", "1" if sheet_layout.sheet.is_remainder else "0")
-        glass.text = sheet_layout.sheet.material + "  "  # Название материала с двойным пробелом
-        
-        # Параметры
-        params = SubElement(glass, "params")
-        
-        # Минимальные размеры
-        min_width = getattr(self, 'min_remnant_width', None)
-        min_height = getattr(self, 'min_remnant_height', None)
-        
-        minwidth = SubElement(params, "minwidth")
-        minwidth.text = str(int(min_width.value())) if min_width and hasattr(min_width, 'value') else "180"
-        
-        minheight = SubElement(params, "minheight")
-        minheight.text = str(int(min_height.value())) if min_height and hasattr(min_height, 'value') else "100"
-        
-        # Границы
-        border = SubElement(params, "border")
-        border.set("left", "0")
-        border.set("right", "0")
-        border.set("top", "0")
-        border.set("bottom", "0")
-        
-        # Ширина реза
-        cutwidth = SubElement(params, "cutwidth")
-        cutwidth.text = "0"
+        """Создание XML файла раскроя в UTF-8 кодировке (по строковым шаблонам, без построения дерева)"""
+        material_name = sheet_layout.sheet.material
         
-        # Секция деталей
-        pieces = SubElement(cutting, "pieces")
-        pieces.set("count", str(len(sheet_layout.placed_details)))
-        
-        # Генерируем резы один раз для использования в разных местах
+        ctx = self._get_run_context()
         cuts = self._generate_guillotine_cuts(sheet_layout)
+        placed_details = sheet_layout.placed_details
+        
+        out = [_XML_HEADER_TMPL.format(
+            id=_xml_escape(str(self._extract_goodsid_from_sheet(sheet_layout)), _XML_ATTR_ENTITIES),
+            width=int(sheet_layout.sheet.width),
+            height=int(sheet_layout.sheet.height),
+            remainder="1" if sheet_layout.sheet.is_remainder else "0",
+            material=_xml_escape(material_name),
+            minwidth=int(ctx['min_remnant_width']),
+            minheight=int(ctx['min_remnant_height']),
+        )]
         
-        # Добавляем все размещенные детали
-        for i, placed_detail in enumerate(sheet_layout.placed_details):
-            piece = SubElement(pieces, "piece")
-            piece.set("num", str(i))
-            
-            # ВСЕГДА используем исходные размеры детали (физические размеры)
-            # height и width должны быть постоянными для одной детали
-            piece.set("width", str(int(placed_detail.detail.width)))
-            piece.set("height", str(int(placed_detail.detail.height)))
-            
-            # direction указывает на поворот детали (0 = нормальная, 1 = повернутая)
-            direction_value = "1" if placed_detail.is_rotated else "0"
-            piece.set("direction", direction_value)
-            
-            # Формируем содержимое piece по формату Altawin:
-            # Строка 1: Наименование материала (Артикул заполнения)
-            # Строка 2: Номер документа заказ стеклопакетов
-            # Строка 3: Наименование изделия
-            
-            # Извлекаем данные из детали
-            material_name = sheet_layout.sheet.material
-            gp_marking = ""
-            orderno = ""
-            oi_name = ""
-            
-            # Артикул заполнения (gp_marking)
-            if hasattr(placed_detail.detail, 'gp_marking') and getattr(placed_detail.detail, 'gp_marking'):
-                gp_marking = str(getattr(placed_detail.detail, 'gp_marking')).strip()
-            
-            # Номер документа (orderno)
-            if hasattr(placed_detail.detail, 'orderno') and getattr(placed_detail.detail, 'orderno'):
-                orderno = str(getattr(placed_detail.detail, 'orderno')).strip()
-            
-            # Наименование стеклопакета (oi_name)
-            if hasattr(placed_detail.detail, 'oi_name') and getattr(placed_detail.detail, 'oi_name'):
-                oi_name = str(getattr(placed_detail.detail, 'oi_name')).strip()
-            
-            # Формируем строки
-            if gp_marking:
-                line1 = f"{material_name} ({gp_marking})"
-            else:
-                line1 = material_name
-            
-            line2 = orderno if orderno else ""
-            line3 = oi_name if oi_name else f"Деталь {i+1}"
-            
-            # Создаем содержимое piece
-            piece.text = f"{line1}\n{line2}\n{line3}"
-            
-            print(f"📄 XML piece {i}: материал+артикул='{line1}', orderno='{line2}', oi_name='{line3}'")
-        
-        # Карта размещения
-        map_elem = SubElement(cutting, "map")
-        
-        # Добавляем позиции деталей
-        for i, placed_detail in enumerate(sheet_layout.placed_details):
-            piece_map = SubElement(map_elem, "piece")
-            piece_map.set("num", str(i))
-            piece_map.set("x", str(int(placed_detail.x)))
-            piece_map.set("y", str(int(placed_detail.y)))
-            
-            # rotate указывает поворот: 0 = не повернута, 1 = повернута на 90°
-            rotate_value = "1" if placed_detail.is_rotated else "0"
-            piece_map.set("rotate", rotate_value)
-            
-            print(f"📄 XML piece {i}: размеры {int(placed_detail.detail.width)}x{int(placed_detail.detail.height)}, "
-                  f"direction={direction_value}, rotate={rotate_value} (direction=1 если повернута, rotate=1 если повернута)")
-        
-        # Добавляем резы (используем уже сгенерированные)
-        self._add_cuts_to_xml_with_cuts(map_elem, cuts)
-        
-        # Остатки
-        remainders = SubElement(cutting, "remainders")
-        
-        # Подсчитываем общее количество остатков и отходов
-        remnant_count = 0
-        
-        # Деловые остатки
-        for rect in sheet_layout.free_rectangles:
-            if rect.width > 0 and rect.height > 0:
-                remainder = SubElement(remainders, "remainder")
-                remainder.set("x", str(int(rect.x)))
-                remainder.set("y", str(int(rect.y)))
-                remainder.set("width", str(int(rect.width)))
-                remainder.set("height", str(int(rect.height)))
-                remainder.set("waste", "0")  # Деловой остаток
-                remnant_count += 1
-        
-        # Отходы
-        for rect in sheet_layout.waste_rectangles:
-            if rect.width > 0 and rect.height > 0:
-                remainder = SubElement(remainders, "remainder")
-                remainder.set("x", str(int(rect.x)))
-                remainder.set("y", str(int(rect.y)))
-                remainder.set("width", str(int(rect.width)))
-                remainder.set("height", str(int(rect.height)))
-                remainder.set("waste", "1")  # Отход
-                remnant_count += 1
-        
-        remainders.set("count", str(remnant_count))
-        
-        # Создаем XML в ANSI (Windows-1251)
-        print(f"📄 Создаем XML в ANSI кодировке (Windows-1251)")
-        
-        # Создаем XML с Windows-1251 кодировкой
-        rough_string = tostring(cutting, encoding='windows-1251')
-        
-        # Парсим и форматируем с отступами
-        reparsed = minidom.parseString(rough_string)
-        
-        # Получаем красиво отформатированный XML в Windows-1251
-        pretty_xml = reparsed.toprettyxml(indent="  ", encoding='windows-1251').decode('windows-1251')
-        
-        # Убираем лишние пустые строки
-        lines = [line for line in pretty_xml.split('\n') if line.strip()]
-        
-        # Устанавливаем XML декларацию для Windows-1251
-        lines[0] = '<?xml version="1.0" encoding="windows-1251" standalone="yes"?>'
-        
-        # Формируем финальный XML в ANSI
-        final_xml_ansi = '\n'.join(lines)
-        
-        # Исправляем форматирование glass элемента - убираем переносы строк внутри
-        import re
-        pattern = r'(<glass[^>]*>)\s*\n\s*([^<]+?)\s*(<params>)'
-        final_xml_ansi = re.sub(pattern, r'\1\2  \3', final_xml_ansi)
-        
-        print(f"📄 Создан XML в ANSI: {len(final_xml_ansi)} символов")
+        # Секция деталей
+        if placed_details:
+            out.append(f'  <pieces count="{len(placed_details)}">\n')
+            for i, placed_detail in enumerate(placed_details):
+                out.append(_PIECE_TMPL.format(
+                    num=i,
+                    width=int(placed_detail.detail.width),
+                    height=int(placed_detail.detail.height),
+                    direction="1" if placed_detail.is_rotated else "0",
+                    text=_xml_escape(_piece_text(material_name, placed_detail.detail, i)),
+                ))
+            out.append('  </pieces>\n')
+        else:
+            out.append('  <pieces count="0" />\n')
+        
+        # Карта размещения: позиции деталей и резы
+        if placed_details or cuts:
+            out.append('  <map>\n')
+            for i, placed_detail in enumerate(placed_details):
+                out.append(_MAP_PIECE_TMPL.format(
+                    num=i, x=int(placed_detail.x), y=int(placed_detail.y),
+                    rotate="1" if placed_detail.is_rotated else "0",
+                ))
+            for cut_info in cuts:
+                if cut_info["orientation"] == "horiz":
+                    out.append(_HORIZ_CUT_TMPL.format(
+                        y=int(cut_info["y"]), x1=int(cut_info["x1"]), x2=int(cut_info["x2"])))
+                else:
+                    out.append(_VERT_CUT_TMPL.format(
+                        x=int(cut_info["x"]), y1=int(cut_info["y1"]), y2=int(cut_info["y2"])))
+            out.append('  </map>\n')
+        else:
+            out.append('  <map />\n')
+        
+        # Остатки: сначала деловые (waste="0"), затем отходы (waste="1")
+        remainder_lines = [
+            _REMAINDER_TMPL.format(x=int(rect.x), y=int(rect.y), width=int(rect.width),
+                                   height=int(rect.height), waste=waste)
+            for rects, waste in ((sheet_layout.free_rectangles, "0"), (sheet_layout.waste_rectangles, "1"))
+            for rect in rects
+            if rect.width > 0 and rect.height > 0
+        ]
+        if remainder_lines:
+            out.append(f'  <remainders count="{len(remainder_lines)}">\n')
+            out.extend(remainder_lines)
+            out.append('  </remainders>\n')
+        else:
+            out.append('  <remainders count="0" />\n')
         
-        # Конвертируем в UTF-8 для отправки
-        print(f"📄 Конвертируем из ANSI в UTF-8 для отправки")
+        out.append('</cutting>')
         
-        try:
-            # Кодируем ANSI строку в байты Windows-1251
-            ansi_bytes = final_xml_ansi.encode('windows-1251')
-            
-            # Декодируем байты как UTF-8 (правильная конвертация)
-            utf8_xml = ansi_bytes.decode('windows-1251')
-            
-            # Меняем декларацию кодировки на UTF-8
-            utf8_xml = utf8_xml.replace(
-                '<?xml version="1.0" encoding="windows-1251" standalone="yes"?>',
-                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
-            )
-            
-            print(f"📄 Конвертирован в UTF-8: {len(utf8_xml)} символов")
-            
-            return utf8_xml
-            
-        except Exception as e:
-            print(f"❌ Ошибка при конвертации из ANSI в UTF-8: {e}")
-            # В случае ошибки возвращаем исходный ANSI XML
-            return final_xml_ansi
+        utf8_xml = ''.join(out)
+        logger.debug("Создан XML в UTF-8: %d символов", len(utf8_xml))
+        return utf8_xml
 
     def fix_xml_dimensions_logic(self, xml_content):
         """
@@ -2811,150 +2775,41 @@ class OptimizerWindow(QWidget):
         3. Создает только необходимые резы без дублирования
         4. Обеспечивает согласованность геометрии
         """
-        print(f"🔧 Генерация гильотинных резов для листа {sheet_layout.sheet.width}x{sheet_layout.sheet.height}")
-        
-        # Собираем все прямоугольники (детали, остатки, отходы)
-        all_rects = sheet_layout.placed_details + sheet_layout.free_rectangles + sheet_layout.waste_rectangles
+        logger.debug("Генерация гильотинных резов для листа %sx%s", sheet_layout.sheet.width, sheet_layout.sheet.height)
         
-        if not all_rects:
-            print("⚠️ Нет прямоугольников для генерации резов")
+        # Координаты всех прямоугольников (детали, остатки, отходы) параллельными списками.
+        # SheetLayout отдает их напрямую, без построения объектов placed_details/free_rectangles/waste_rectangles
+        if hasattr(sheet_layout, 'rects_xyxy'):
+            rx0, ry0, rx1, ry1 = sheet_layout.rects_xyxy
+        else:
+            all_rects = [*sheet_layout.placed_details, *sheet_layout.free_rectangles, *sheet_layout.waste_rectangles]
+            rx0 = [rect.x for rect in all_rects]
+            ry0 = [rect.y for rect in all_rects]
+            rx1 = [rect.x + rect.width for rect in all_rects]
+            ry1 = [rect.y + rect.height for rect in all_rects]
+        
+        if not rx0:
+            logger.warning("Нет прямоугольников для генерации резов")
             return []
 
-        # Собираем все уникальные координаты
-        x_coords = {0, sheet_layout.sheet.width}  # Границы листа
-        y_coords = {0, sheet_layout.sheet.height}  # Границы листа
-
-        # Добавляем координаты всех прямоугольников
-        for rect in all_rects:
-            x_coords.add(rect.x)
-            x_coords.add(rect.x + rect.width)
-            y_coords.add(rect.y)
-            y_coords.add(rect.y + rect.height)
+        # Собираем все уникальные координаты (включая границы листа)
+        x_coords = {0, sheet_layout.sheet.width, *rx0, *rx1}
+        y_coords = {0, sheet_layout.sheet.height, *ry0, *ry1}
 
         # Сортируем координаты и убираем дубликаты
         sorted_x = sorted([x for x in x_coords if x is not None])
         sorted_y = sorted([y for y in y_coords if y is not None])
 
-        print(f"🔧 X координаты: {sorted_x}")
-        print(f"🔧 Y координаты: {sorted_y}")
-
-        def point_is_inside_rect(px, py, rect):
-            """Проверяет, находится ли точка внутри прямоугольника"""
-            return (rect.x <= px < rect.x + rect.width and 
-                    rect.y <= py < rect.y + rect.height)
-
-        def find_rect_at_point(px, py):
-            """Находит прямоугольник, содержащий точку"""
-            for i, rect in enumerate(all_rects):
-                if point_is_inside_rect(px, py, rect):
-                    return i
-            return -1  # Пустое место
-
-        cuts = []
-
-        # Проверяем вертикальные резы (внутренние X координаты)
-        for x in sorted_x[1:-1]:  # Исключаем границы листа
-            # Проверяем каждый сегмент по Y
-            segments = []
-            for i in range(len(sorted_y) - 1):
-                y1, y2 = sorted_y[i], sorted_y[i + 1]
-                
-                # Проверяем середину сегмента
-                mid_y = (y1 + y2) / 2
-                
-                # Находим прямоугольники слева и справа от линии реза
-                left_rect = find_rect_at_point(x - 0.1, mid_y)
-                right_rect = find_rect_at_point(x + 0.1, mid_y)
-                
-                # Если слева и справа разные прямоугольники, нужен рез
-                if left_rect != right_rect:
-                    segments.append((y1, y2))
-            
-            # Объединяем соседние сегменты в один длинный рез
-            if segments:
-                # Сортируем сегменты по Y
-                segments.sort()
-                
-                # Объединяем соседние сегменты
-                merged_segments = []
-                current_start, current_end = segments[0]
-                
-                for i in range(1, len(segments)):
-                    seg_start, seg_end = segments[i]
-                    
-                    # Если сегменты соседние, объединяем
-                    if abs(current_end - seg_start) < 1e-5:
-                        current_end = seg_end
-                    else:
-                        # Сохраняем текущий сегмент и начинаем новый
-                        merged_segments.append((current_start, current_end))
-                        current_start, current_end = seg_start, seg_end
-                
-                # Добавляем последний сегмент
-                merged_segments.append((current_start, current_end))
-                
-                # Создаем резы из объединенных сегментов
-                for y1, y2 in merged_segments:
-                    cuts.append({
-                        "orientation": "vert",
-                        "x": x,
-                        "y1": y1,
-                        "y2": y2
-                    })
-                    print(f"📏 Вертикальный рез: x={x}, y1={y1}, y2={y2}")
-
-        # Проверяем горизонтальные резы (внутренние Y координаты)
-        for y in sorted_y[1:-1]:  # Исключаем границы листа
-            # Проверяем каждый сегмент по X
-            segments = []
-            for i in range(len(sorted_x) - 1):
-                x1, x2 = sorted_x[i], sorted_x[i + 1]
-                
-                # Проверяем середину сегмента
-                mid_x = (x1 + x2) / 2
-                
-                # Находим прямоугольники сверху и снизу от линии реза
-                below_rect = find_rect_at_point(mid_x, y - 0.1)
-                above_rect = find_rect_at_point(mid_x, y + 0.1)
-                
-                # Если сверху и снизу разные прямоугольники, нужен рез
-                if below_rect != above_rect:
-                    segments.append((x1, x2))
-            
-            # Объединяем соседние сегменты в один длинный рез
-            if segments:
-                # Сортируем сегменты по X
-                segments.sort()
-                
-                # Объединяем соседние сегменты
-                merged_segments = []
-                current_start, current_end = segments[0]
-                
-                for i in range(1, len(segments)):
-                    seg_start, seg_end = segments[i]
-                    
-                    # Если сегменты соседние, объединяем
-                    if abs(current_end - seg_start) < 1e-5:
-                        current_end = seg_end
-                    else:
-                        # Сохраняем текущий сегмент и начинаем новый
-                        merged_segments.append((current_start, current_end))
-                        current_start, current_end = seg_start, seg_end
-                
-                # Добавляем последний сегмент
-                merged_segments.append((current_start, current_end))
-                
-                # Создаем резы из объединенных сегментов
-                for x1, x2 in merged_segments:
-                    cuts.append({
-                        "orientation": "horiz",
-                        "y": y,
-                        "x1": x1,
-                        "x2": x2
-                    })
-                    print(f"📏 Горизонтальный рез: y={y}, x1={x1}, x2={x2}")
-
-        print(f"🔧 Создано резов: {len(cuts)}")
+        logger.debug("X координаты: %s", sorted_x)
+        logger.debug("Y координаты: %s", sorted_y)
+
+        vert_cuts, horiz_cuts = _build_cuts_from_grid(sorted_x, sorted_y, rx0, ry0, rx1, ry1)
+        
+        # Порядок как прежде: сначала вертикальные, затем горизонтальные резы
+        cuts = [{"orientation": "vert", "x": x, "y1": y1, "y2": y2} for x, y1, y2 in vert_cuts]
+        cuts.extend({"orientation": "horiz", "y": y, "x1": x1, "x2": x2} for y, x1, x2 in horiz_cuts)
+
+        logger.debug("Создано резов: %d", len(cuts))
         return cuts
 
     def set_task_id(self, task_id: str):
@@ -2962,168 +2817,6 @@ class OptimizerWindow(QWidget):
         if task_id:
             self.grorderid_input.setText(str(task_id))
 
-    def _calculate_actual_piece_dimensions_with_cuts(self, sheet_layout, cuts):
-        """
-        Пересчитывает реальные размеры кусков на основе уже сгенерированных резов.
-        Возвращает словарь {piece_index: (actual_width, actual_height)}
-        """
-        print(f"🔧 Пересчет размеров кусков для обеспечения согласованности (оптимизированная версия)")
-        
-        # Собираем все координаты резов
-        x_cuts = {0, sheet_layout.sheet.width}  # Границы листа
-        y_cuts = {0, sheet_layout.sheet.height}  # Границы листа
-        
-        for cut in cuts:
-            if cut["orientation"] == "vert":
-                x_cuts.add(cut["x"])
-            else:  # horiz
-                y_cuts.add(cut["y"])
-        
-        # Сортируем координаты
-        sorted_x_cuts = sorted(x_cuts)
-        sorted_y_cuts = sorted(y_cuts)
-        
-        print(f"🔧 X резы: {sorted_x_cuts}")
-        print(f"🔧 Y резы: {sorted_y_cuts}")
-        
-        # Создаем сетку ячеек между резами
-        cells = []
-        for i in range(len(sorted_x_cuts) - 1):
-            for j in range(len(sorted_y_cuts) - 1):
-                x1, x2 = sorted_x_cuts[i], sorted_x_cuts[i + 1]
-                y1, y2 = sorted_y_cuts[j], sorted_y_cuts[j + 1]
-                cells.append({
-                    'x': x1,
-                    'y': y1,
-                    'width': x2 - x1,
-                    'height': y2 - y1,
-                    'center_x': (x1 + x2) / 2,
-                    'center_y': (y1 + y2) / 2
-                })
-        
-        # Сопоставляем куски с ячейками сетки
-        piece_dimensions = {}
-        
-        for piece_idx, placed_detail in enumerate(sheet_layout.placed_details):
-            # Находим центр куска
-            piece_center_x = placed_detail.x + placed_detail.width / 2
-            piece_center_y = placed_detail.y + placed_detail.height / 2
-            
-            # Ищем ячейку, содержащую центр куска
-            for cell in cells:
-                if (cell['x'] <= piece_center_x < cell['x'] + cell['width'] and
-                    cell['y'] <= piece_center_y < cell['y'] + cell['height']):
-                    
-                    # Найдена соответствующая ячейка
-                    actual_width = cell['width']
-                    actual_height = cell['height']
-                    
-                    piece_dimensions[piece_idx] = (actual_width, actual_height)
-                    
-                    print(f"🔧 Кусок {piece_idx}: исходный={int(placed_detail.width)}x{int(placed_detail.height)}, "
-                          f"реальный={int(actual_width)}x{int(actual_height)}")
-                    break
-            else:
-                # Если не нашли соответствующую ячейку, используем исходные размеры
-                piece_dimensions[piece_idx] = (placed_detail.width, placed_detail.height)
-                print(f"⚠️ Кусок {piece_idx}: не найдена ячейка, используем исходные размеры")
-        
-        return piece_dimensions
-
-    def _add_cuts_to_xml_with_cuts(self, map_elem, cuts):
-        """Добавление уже сгенерированных резов в XML"""
-        from xml.etree.ElementTree import SubElement
-        
-        print(f"🔧 Добавление {len(cuts)} резов в XML")
-        
-        # Добавляем резы в правильном порядке параметров для Altawin
-        for cut_info in cuts:
-            cut = SubElement(map_elem, "cut")
-            
-            if cut_info["orientation"] == "horiz":
-                # Для горизонтальных резов: y, orientation, x1, x2
-                cut.set("y", str(int(cut_info["y"])))
-                cut.set("orientation", cut_info["orientation"])
-                cut.set("x1", str(int(cut_info["x1"])))
-                cut.set("x2", str(int(cut_info["x2"])))
-            else:  # vert
-                # Для вертикальных резов: x, orientation, y1, y2
-                cut.set("x", str(int(cut_info["x"])))
-                cut.set("orientation", cut_info["orientation"])
-                cut.set("y1", str(int(cut_info["y1"])))
-                cut.set("y2", str(int(cut_info["y2"])))
-
-    def _calculate_actual_piece_dimensions(self, sheet_layout):
-        """
-        Пересчитывает реальные размеры кусков на основе геометрии раскроя.
-        Возвращает словарь {piece_index: (actual_width, actual_height)}
-        """
-        print(f"🔧 Пересчет размеров кусков для обеспечения согласованности")
-        
-        # Генерируем резы для анализа геометрии
-        cuts = self._generate_guillotine_cuts(sheet_layout)
-        
-        # Собираем все координаты резов
-        x_cuts = {0, sheet_layout.sheet.width}  # Границы листа
-        y_cuts = {0, sheet_layout.sheet.height}  # Границы листа
-        
-        for cut in cuts:
-            if cut["orientation"] == "vert":
-                x_cuts.add(cut["x"])
-            else:  # horiz
-                y_cuts.add(cut["y"])
-        
-        # Сортируем координаты
-        sorted_x_cuts = sorted(x_cuts)
-        sorted_y_cuts = sorted(y_cuts)
-        
-        print(f"🔧 X резы: {sorted_x_cuts}")
-        print(f"🔧 Y резы: {sorted_y_cuts}")
-        
-        # Создаем сетку ячеек между резами
-        cells = []
-        for i in range(len(sorted_x_cuts) - 1):
-            for j in range(len(sorted_y_cuts) - 1):
-                x1, x2 = sorted_x_cuts[i], sorted_x_cuts[i + 1]
-                y1, y2 = sorted_y_cuts[j], sorted_y_cuts[j + 1]
-                cells.append({
-                    'x': x1,
-                    'y': y1,
-                    'width': x2 - x1,
-                    'height': y2 - y1,
-                    'center_x': (x1 + x2) / 2,
-                    'center_y': (y1 + y2) / 2
-                })
-        
-        # Сопоставляем куски с ячейками сетки
-        piece_dimensions = {}
-        
-        for piece_idx, placed_detail in enumerate(sheet_layout.placed_details):
-            # Находим центр куска
-            piece_center_x = placed_detail.x + placed_detail.width / 2
-            piece_center_y = placed_detail.y + placed_detail.height / 2
-            
-            # Ищем ячейку, содержащую центр куска
-            for cell in cells:
-                if (cell['x'] <= piece_center_x < cell['x'] + cell['width'] and
-                    cell['y'] <= piece_center_y < cell['y'] + cell['height']):
-                    
-                    # Найдена соответствующая ячейка
-                    actual_width = cell['width']
-                    actual_height = cell['height']
-                    
-                    piece_dimensions[piece_idx] = (actual_width, actual_height)
-                    
-                    print(f"🔧 Кусок {piece_idx}: исходный={int(placed_detail.width)}x{int(placed_detail.height)}, "
-                          f"реальный={int(actual_width)}x{int(actual_height)}")
-                    break
-            else:
-                # Если не нашли соответствующую ячейку, используем исходные размеры
-                piece_dimensions[piece_idx] = (placed_detail.width, placed_detail.height)
-                print(f"⚠️ Кусок {piece_idx}: не найдена ячейка, используем исходные размеры")
-        
-        return piece_dimensions
-
     def load_optimization_settings(self):
         """Загрузка настроек оптимизации из файла или установка значений по умолчанию"""
         try:
@@ -3168,8 +2861,10 @@ class OptimizerWindow(QWidget):
     
     def show_password_management_dialog(self):
         """Показать диалог управления паролями"""
-        dialog = PasswordManagementDialog(self.password_manager, self)
-        dialog.exec_()
+        # Диалог создается один раз и переиспользуется при следующих открытиях
+        if self.password_dialog is None:
+            self.password_dialog = PasswordManagementDialog(self.password_manager, self)
+        self.password_dialog.exec_()
     
     def show_remainder_password_menu(self, position):
         """Показать контекстное меню для поля '% отхода для деловых остатков'"""
@@ -9,6 +9,20 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt
 from .password_manager import PasswordManager
 
+# Стиль кнопки "Закрыть" (одна строка на все экземпляры диалога)
+_CLOSE_BTN_QSS = """
+    QPushButton {
+        background-color: #0078d4;
+        color: white;
+        font-weight: bold;
+        padding: 8px 16px;
+        min-width: 100px;
+    }
+    QPushButton:hover {
+        background-color: #106ebe;
+    }
+"""
+
 class PasswordManagementDialog(QDialog):
     """Диалог для управления паролями"""
     
@@ -77,18 +91,7 @@ class PasswordManagementDialog(QDialog):
         
         close_btn = QPushButton("Закрыть")
         close_btn.clicked.connect(self.accept)
-        close_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #0078d4;
-                color: white;
-                font-weight: bold;
-                padding: 8px 16px;
-                min-width: 100px;
-            }
-            QPushButton:hover {
-                background-color: #106ebe;
-            }
-        """)
+        close_btn.setStyleSheet(_CLOSE_BTN_QSS)
         buttons_layout.addWidget(close_btn)
         
         layout.addLayout(buttons_layout)
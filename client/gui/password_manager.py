@@ -2,13 +2,35 @@
 Менеджер паролей для защиты критических параметров приложения
 """
 
+import functools
 import hashlib
+import hmac
 import json
 import os
+import types
 from typing import Optional, Dict, Any, Set
 from PyQt5.QtWidgets import QInputDialog, QMessageBox, QWidget, QLineEdit
 from PyQt5.QtCore import Qt
 
+# Конструктор SHA-256 привязан один раз (без поиска атрибута модуля на каждом хешировании)
+_SHA = hashlib.sha256
+
+# Пользовательские названия действий (постоянные, поэтому поиск можно кэшировать)
+_ACTION_DISPLAY_NAMES = {
+    'remainder_waste_percent': '% отхода для деловых остатков',
+    'save_default_settings': 'Сохранить параметры по умолчанию'
+}
+
+
+@functools.lru_cache(maxsize=16)
+def _display_name(action: str) -> str:
+    """Пользовательское название действия (техническое, если название не задано)"""
+    return _ACTION_DISPLAY_NAMES.get(action, action)
+
+
+# Размер буфера файловых операций: файл читается и пишется за один системный вызов
+_IO_BUFFER_SIZE = 128 * 1024
+
 class PasswordManager:
     """Класс для управления паролями и их проверки"""
     
@@ -25,22 +47,29 @@ class PasswordManager:
             'save_default_settings': 'admin456'
         }
         
-        # Словарь соответствий технических названий пользовательским
-        self.action_display_names = {
-            'remainder_waste_percent': '% отхода для деловых остатков',
-            'save_default_settings': 'Сохранить параметры по умолчанию'
-        }
+        # Словарь соответствий технических названий пользовательским (только чтение:
+        # общий для всех экземпляров и закэширован в _display_name)
+        self.action_display_names = types.MappingProxyType(_ACTION_DISPLAY_NAMES)
         
         # Кэш успешных проверок пароля в рамках сессии
         self._verified_actions: Set[str] = set()
+        # Дайджесты паролей в виде сырых байт (проверка без hex-кодирования на каждый ввод)
+        self._digests: Dict[str, bytes] = {}
+        # Известные действия (ключи загруженных паролей), обновляются вместе с дайджестами
+        self._known_actions: frozenset = frozenset()
         self._load_passwords()
+        self._refresh_digests()
     
     def _load_passwords(self):
         """Загрузка паролей из файла или создание дефолтных"""
         try:
             if os.path.exists(self.password_file):
-                with open(self.password_file, 'r', encoding='utf-8') as f:
-                    self.passwords = json.load(f)
+                # Читаем файл целиком байтами: json.loads сам определяет UTF-8, без текстового декодера
+                with open(self.password_file, 'rb', buffering=_IO_BUFFER_SIZE) as f:
+                    self.passwords = json.loads(f.read())
+                # Корректный JSON, но не объект (например, []) - как поврежденный файл
+                if not isinstance(self.passwords, dict):
+                    raise ValueError(f"ожидался объект JSON, получен {type(self.passwords).__name__}")
             else:
                 # Создаем дефолтные пароли
                 self.passwords = {}
@@ -58,18 +87,34 @@ class PasswordManager:
         """Сохранение паролей в файл"""
         try:
             os.makedirs(os.path.dirname(self.password_file) if os.path.dirname(self.password_file) else '.', exist_ok=True)
-            with open(self.password_file, 'w', encoding='utf-8') as f:
-                json.dump(self.passwords, f, ensure_ascii=False, indent=2)
+            # Пишем во временный файл и атомарно подменяем основной - файл никогда не остается записанным наполовину
+            tmp_file = self.password_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8', buffering=_IO_BUFFER_SIZE) as f:
+                # Сериализуем целиком и пишем одним вызовом (json.dump пишет в файл множеством мелких кусков)
+                f.write(json.dumps(self.passwords, ensure_ascii=False, indent=2))
+            os.replace(tmp_file, self.password_file)
         except Exception as e:
             print(f"Ошибка при сохранении паролей: {e}")
     
     def _hash_password(self, password: str) -> str:
         """Хеширование пароля"""
-        return hashlib.sha256(password.encode('utf-8')).hexdigest()
+        return _SHA(password.encode('utf-8')).hexdigest()
     
-    def _verify_password(self, password: str, stored_hash: str) -> bool:
-        """Проверка пароля"""
-        return self._hash_password(password) == stored_hash
+    def _refresh_digests(self):
+        """Пересчет байтовых дайджестов из hex-хешей (после загрузки или смены пароля)"""
+        digests = {}
+        for action, stored_hash in self.passwords.items():
+            try:
+                digests[action] = bytes.fromhex(stored_hash)
+            except (TypeError, ValueError):
+                # Поврежденный хеш в файле - такой пароль не совпадет ни с одним вводом
+                digests[action] = b''
+        self._digests = digests
+        self._known_actions = frozenset(digests)
+    
+    def _verify_password(self, password: str, action: str) -> bool:
+        """Проверка пароля (сравнение за постоянное время - без утечки по времени ответа)"""
+        return hmac.compare_digest(_SHA(password.encode('utf-8')).digest(), self._digests.get(action, b''))
     
     def check_password(self, action: str, parent_widget: Optional[QWidget] = None) -> bool:
         """
@@ -82,7 +127,7 @@ class PasswordManager:
         Returns:
             True если пароль введен правильно, False в противном случае
         """
-        if action not in self.passwords:
+        if action not in self._known_actions:
             print(f"Неизвестное действие: {action}")
             return False
         
@@ -104,7 +149,7 @@ class PasswordManager:
             return False
         
         # Проверяем пароль
-        if self._verify_password(password, self.passwords[action]):
+        if self._verify_password(password, action):
             # Добавляем действие в кэш успешных проверок
             self._verified_actions.add(action)
             return True
@@ -136,12 +181,14 @@ class PasswordManager:
         Returns:
             True если пароль изменен успешно, False в противном случае
         """
-        if action not in self.passwords:
+        if action not in self._known_actions:
             print(f"Неизвестное действие: {action}")
             return False
         
-        # Запрашиваем текущий пароль
+        # Название действия нужно во всех диалогах ниже - получаем один раз
         display_name = self.get_display_name(action)
+        
+        # Запрашиваем текущий пароль
         current_password, ok = QInputDialog.getText(
             parent_widget,
             "Текущий пароль",
@@ -154,7 +201,7 @@ class PasswordManager:
             return False
         
         # Проверяем текущий пароль
-        if not self._verify_password(current_password, self.passwords[action]):
+        if not self._verify_password(current_password, action):
             QMessageBox.warning(
                 parent_widget,
                 "Неверный пароль",
@@ -164,7 +211,6 @@ class PasswordManager:
             return False
         
         # Запрашиваем новый пароль
-        display_name = self.get_display_name(action)
         new_password, ok = QInputDialog.getText(
             parent_widget,
             "Новый пароль",
@@ -177,7 +223,6 @@ class PasswordManager:
             return False
         
         # Подтверждаем новый пароль
-        display_name = self.get_display_name(action)
         confirm_password, ok = QInputDialog.getText(
             parent_widget,
             "Подтверждение пароля",
@@ -198,11 +243,11 @@ class PasswordManager:
         # Сохраняем новый пароль
         self.passwords[action] = self._hash_password(new_password)
         self._save_passwords()
+        self._refresh_digests()
         
         # Удаляем действие из кэша, так как пароль изменился
         self._verified_actions.discard(action)
         
-        display_name = self.get_display_name(action)
         QMessageBox.information(
             parent_widget,
             "Пароль изменен",
@@ -221,6 +266,7 @@ class PasswordManager:
         if action in self.default_passwords:
             self.passwords[action] = self._hash_password(self.default_passwords[action])
             self._save_passwords()
+            self._refresh_digests()
             # Удаляем действие из кэша, так как пароль изменился
             self._verified_actions.discard(action)
             return True
@@ -236,4 +282,4 @@ class PasswordManager:
         Returns:
             Пользовательское название действия
         """
-        return self.action_display_names.get(action, action) 
\ No newline at end of file
+        return _display_name(action) 
\ No newline at end of file
@@ -7,6 +7,9 @@ import json
 import os
 from typing import Dict, Any, Optional
 
+# Размер буфера файловых операций: файл читается и пишется за один системный вызов
+_IO_BUFFER_SIZE = 128 * 1024
+
 class SettingsManager:
     """Класс для управления настройками пользователя"""
     
@@ -37,8 +40,9 @@ class SettingsManager:
         """
         try:
             if os.path.exists(self.settings_file):
-                with open(self.settings_file, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
+                # Читаем файл целиком байтами: json.loads сам определяет UTF-8, без текстового декодера
+                with open(self.settings_file, 'rb', buffering=_IO_BUFFER_SIZE) as f:
+                    settings = json.loads(f.read())
                     # Объединяем с дефолтными настройками на случай, если в файле нет всех параметров
                     merged_settings = self.default_settings.copy()
                     merged_settings.update(settings)
@@ -63,8 +67,9 @@ class SettingsManager:
             # Создаем директорию если её нет
             os.makedirs(os.path.dirname(self.settings_file) if os.path.dirname(self.settings_file) else '.', exist_ok=True)
             
-            with open(self.settings_file, 'w', encoding='utf-8') as f:
-                json.dump(settings, f, ensure_ascii=False, indent=2)
+            with open(self.settings_file, 'w', encoding='utf-8', buffering=_IO_BUFFER_SIZE) as f:
+                # Сериализуем целиком и пишем одним вызовом (json.dump пишет в файл множеством мелких кусков)
+                f.write(json.dumps(settings, ensure_ascii=False, indent=2))
             return True
         except Exception as e:
             print(f"Ошибка при сохранении настроек: {e}")
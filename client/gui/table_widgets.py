@@ -2,56 +2,99 @@
 Виджеты и функции для работы с таблицами в приложении оптимизации
 """
 
-from PyQt5.QtWidgets import QTableWidget, QTableWidgetItem, QHeaderView
-from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QTableWidget, QTableWidgetItem, QTableView, QHeaderView
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from collections import Counter
+from contextlib import contextmanager
+from itertools import repeat
 import logging
+import sys
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
 
 
+# Выравнивание ячеек: флаги собираются один раз, а не на каждую ячейку
+_RIGHT = int(Qt.AlignRight | Qt.AlignVCenter)
+_LEFT = int(Qt.AlignLeft | Qt.AlignVCenter)
+
+
+class _NumItem(QTableWidgetItem):
+    """Числовая ячейка: текст str(value), число в UserRole для сортировки, выравнивание по правому краю"""
+    
+    def __init__(self, value):
+        # Текст задаем сами (число в DisplayRole делегат вывел бы в формате системной локали: "6 000")
+        super().__init__(str(value))
+        self.setData(Qt.UserRole, value)
+        self.setTextAlignment(_RIGHT)
+    
+    def __lt__(self, other):
+        # Сортировка по числу, а не по тексту ("10" < "9")
+        if isinstance(other, _NumItem):
+            return self.data(Qt.UserRole) < other.data(Qt.UserRole)
+        return super().__lt__(other)
+
+
+def _parse_numeric_str(value, default):
+    """Разбор числа из строки: пустые и 'none'/'null'/'nan' дают значение по умолчанию"""
+    # Удаляем пробелы и проверяем на пустоту
+    cleaned_value = value.strip()
+    if cleaned_value == '' or cleaned_value.lower() in ('none', 'null', 'nan'):
+        return default
+    # Пытаемся преобразовать в число
+    try:
+        return int(float(cleaned_value))
+    except (ValueError, TypeError, OverflowError):
+        return default
+
+
+def _numeric_default(value, default):
+    return default
+
+
+# Преобразование значения ячейки по точному типу: один поиск в словаре вместо цепочки isinstance
+_NUMERIC_CONVERTERS = {
+    int: lambda value, default: value,
+    float: lambda value, default: value,
+    bool: lambda value, default: int(value),
+    str: _parse_numeric_str,
+    type(None): _numeric_default,
+}
+
+
 def _create_numeric_item(value, default=0):
     """Создание элемента таблицы для числовых значений с правильной сортировкой"""
     try:
-        # УЛУЧШЕННАЯ ОБРАБОТКА: проверяем различные типы данных
-        if value is None:
-            numeric_value = default
-        elif isinstance(value, (int, float)):
-            numeric_value = int(value) if isinstance(value, int) else float(value)
-        elif isinstance(value, str):
-            # Удаляем пробелы и проверяем на пустоту
-            cleaned_value = str(value).strip()
-            if cleaned_value == '' or cleaned_value.lower() in ['none', 'null', 'nan']:
-                numeric_value = default
-            else:
-                # Пытаемся преобразовать в число
-                try:
-                    numeric_value = int(float(cleaned_value))
-                except (ValueError, TypeError):
-                    numeric_value = default
-        else:
-            numeric_value = default
-        
-        # ОБЯЗАТЕЛЬНО создаем элемент с данными
-        item = QTableWidgetItem()
-        item.setData(Qt.DisplayRole, numeric_value)
+        # Неизвестные типы дают значение по умолчанию
+        numeric_value = _NUMERIC_CONVERTERS.get(type(value), _numeric_default)(value, default)
         
-        # ДОПОЛНИТЕЛЬНАЯ ЗАЩИТА: устанавливаем текст для отображения
-        item.setText(str(numeric_value))
-        
-        # КРИТИЧНО: Устанавливаем выравнивание по правому краю для чисел
-        item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-        
-        return item
+        # ОБЯЗАТЕЛЬНО создаем элемент с данными (выравнивание по правому краю задает _NumItem)
+        return _NumItem(numeric_value)
         
     except Exception as e:
         # FALLBACK: в случае любой ошибки создаем элемент со значением по умолчанию
         logger.warning(f"Error creating numeric item for value '{value}': {e}")
-        item = QTableWidgetItem()
-        item.setData(Qt.DisplayRole, default)
-        item.setText(str(default))
-        item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-        return item
+        return _NumItem(default)
+
+
+def _make_numeric_item_for(dtype, default=0):
+    """
+    Фабрика числовых ячеек, специализированная под тип значений столбца.
+    Значения ожидаемого типа идут сразу в _NumItem, остальные - через общий _create_numeric_item
+    """
+    if dtype is int or dtype is float:
+        def make_item(value):
+            if type(value) is dtype:
+                return _NumItem(value)
+            return _create_numeric_item(value, default)
+    else:
+        convert = _NUMERIC_CONVERTERS.get(dtype, _numeric_default)
+        
+        def make_item(value):
+            if type(value) is dtype:
+                return _NumItem(convert(value, default))
+            return _create_numeric_item(value, default)
+    return make_item
 
 
 def _create_text_item(value):
@@ -71,14 +114,11 @@ def _create_text_item(value):
         if text_value.lower() in ['none', 'null', 'nan']:
             text_value = ''
         
-        # ОБЯЗАТЕЛЬНО создаем элемент
+        # ОБЯЗАТЕЛЬНО создаем элемент (конструктор уже задает текст)
         item = QTableWidgetItem(text_value)
         
-        # ДОПОЛНИТЕЛЬНАЯ ЗАЩИТА: устанавливаем текст явно
-        item.setText(text_value)
-        
         # Устанавливаем выравнивание по левому краю для текста
-        item.setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)
+        item.setTextAlignment(_LEFT)
         
         return item
         
@@ -86,55 +126,87 @@ def _create_text_item(value):
         # FALLBACK: в случае любой ошибки создаем пустой элемент
         logger.warning(f"Error creating text item for value '{value}': {e}")
         item = QTableWidgetItem('')
-        item.setText('')
-        item.setTextAlignment(Qt.AlignLeft | Qt.AlignVCenter)
+        item.setTextAlignment(_LEFT)
         return item
 
 
-def _ensure_table_update(table: QTableWidget):
-    """Гарантирует обновление отображения таблицы"""
+def _ensure_table_update(table: QTableView):
+    """Гарантирует обновление отображения таблицы (QTableWidget или QTableView с моделью)"""
     try:
-        # Принудительное обновление размеров столбцов
-        table.resizeColumnsToContents()
+        header = table.horizontalHeader()
         
-        # Немного расширяем столбцы для лучшего вида
-        for col in range(table.columnCount()):
-            current_width = table.columnWidth(col)
-            table.setColumnWidth(col, current_width + 20)
+        # Режимы заголовка задаются один раз при создании таблицы (OptimizerWindow),
+        # ширина столбцов по содержимому пересчитывается после загрузки (update_all_table_widths),
+        # поэтому здесь ячейки не измеряются на каждом заполнении
         
-        # Обновление размеров строк
-        table.resizeRowsToContents()
-        
-        # Принудительная перерисовка
+        # Перерисовка (viewport().update() уже планирует ее - отдельный table.update() не нужен)
         table.viewport().update()
-        table.update()
         
         # Убеждаемся что заголовки видны
-        if table.horizontalHeader():
-            table.horizontalHeader().setVisible(True)
+        header.setVisible(True)
             
     except Exception as e:
         logger.error(f"Error updating table display: {e}")
 
 
+# Высота строк таблиц (одинаковая для всех строк)
+_ROW_HEIGHT = 22
+
+
+def _use_fixed_row_height(table: QTableView):
+    """
+    Фиксированная высота строк вместо resizeRowsToContents:
+    не нужно измерять шрифтом каждую ячейку после заполнения
+    """
+    vertical_header = table.verticalHeader()
+    vertical_header.setSectionResizeMode(QHeaderView.Fixed)
+    vertical_header.setDefaultSectionSize(_ROW_HEIGHT)
+
+
+@contextmanager
+def _bulk_table_update(table: QTableWidget):
+    """
+    Массовое заполнение таблицы: на время заполнения отключены перерисовка, сигналы и сортировка.
+    Таблица перерисовывается и сортируется один раз после выхода из блока
+    """
+    sorting_enabled = table.isSortingEnabled()
+    signals_blocked = table.blockSignals(True)
+    table.setUpdatesEnabled(False)
+    table.setSortingEnabled(False)
+    try:
+        yield table
+    finally:
+        table.setSortingEnabled(sorting_enabled)
+        table.blockSignals(signals_blocked)
+        table.setUpdatesEnabled(True)
+
+
 def fill_details_table(table: QTableWidget, details):
     """Заполнение таблицы деталей"""
     if not details:
         table.setRowCount(0)
         return
     
-    # Настройка таблицы
-    table.setColumnCount(5)
-    table.setHorizontalHeaderLabels(['Материал', 'Наименование', 'Высота', 'Ширина', 'Количество'])
-    table.setRowCount(len(details))
-    
-    # Заполнение строк
-    for row, detail in enumerate(details):
-        table.setItem(row, 0, _create_text_item(detail.get('g_marking', '')))
-        table.setItem(row, 1, _create_text_item(detail.get('oi_name', '')))
-        table.setItem(row, 2, _create_numeric_item(detail.get('height', '')))
-        table.setItem(row, 3, _create_numeric_item(detail.get('width', '')))
-        table.setItem(row, 4, _create_numeric_item(detail.get('total_qty', '')))
+    with _bulk_table_update(table):
+        _use_fixed_row_height(table)
+        # Настройка таблицы
+        table.setColumnCount(5)
+        table.setHorizontalHeaderLabels(['Материал', 'Наименование', 'Высота', 'Ширина', 'Количество'])
+        table.setRowCount(len(details))
+        
+        # Фабрики ячеек под тип значений столбцов (по первой строке)
+        first = details[0]
+        height_item = _make_numeric_item_for(type(first.get('height', '')))
+        width_item = _make_numeric_item_for(type(first.get('width', '')))
+        qty_item = _make_numeric_item_for(type(first.get('total_qty', '')))
+        
+        # Заполнение строк
+        for row, detail in enumerate(details):
+            table.setItem(row, 0, _create_text_item(detail.get('g_marking', '')))
+            table.setItem(row, 1, _create_text_item(detail.get('oi_name', '')))
+            table.setItem(row, 2, height_item(detail.get('height', '')))
+            table.setItem(row, 3, width_item(detail.get('width', '')))
+            table.setItem(row, 4, qty_item(detail.get('total_qty', '')))
     
     # Гарантированное обновление
     _ensure_table_update(table)
@@ -146,17 +218,25 @@ def fill_materials_table(table: QTableWidget, materials):
         table.setRowCount(0)
         return
     
-    # Настройка таблицы
-    table.setColumnCount(4)
-    table.setHorizontalHeaderLabels(['Материал', 'Высота', 'Ширина', 'Количество'])
-    table.setRowCount(len(materials))
-    
-    # Заполнение строк
-    for row, material in enumerate(materials):
-        table.setItem(row, 0, _create_text_item(material.get('g_marking', '')))
-        table.setItem(row, 1, _create_numeric_item(material.get('height', '')))
-        table.setItem(row, 2, _create_numeric_item(material.get('width', '')))
-        table.setItem(row, 3, _create_numeric_item(material.get('qty', '')))
+    with _bulk_table_update(table):
+        _use_fixed_row_height(table)
+        # Настройка таблицы
+        table.setColumnCount(4)
+        table.setHorizontalHeaderLabels(['Материал', 'Высота', 'Ширина', 'Количество'])
+        table.setRowCount(len(materials))
+        
+        # Фабрики ячеек под тип значений столбцов (по первой строке)
+        first = materials[0]
+        height_item = _make_numeric_item_for(type(first.get('height', '')))
+        width_item = _make_numeric_item_for(type(first.get('width', '')))
+        qty_item = _make_numeric_item_for(type(first.get('qty', '')))
+        
+        # Заполнение строк
+        for row, material in enumerate(materials):
+            table.setItem(row, 0, _create_text_item(material.get('g_marking', '')))
+            table.setItem(row, 1, height_item(material.get('height', '')))
+            table.setItem(row, 2, width_item(material.get('width', '')))
+            table.setItem(row, 3, qty_item(material.get('qty', '')))
     
     # Гарантированное обновление
     _ensure_table_update(table)
@@ -168,161 +248,218 @@ def fill_remainders_table(table: QTableWidget, remainders):
         table.setRowCount(0)
         return
     
-    # Настройка таблицы
-    table.setColumnCount(4)
-    table.setHorizontalHeaderLabels(['Материал', 'Высота', 'Ширина', 'Количество'])
-    table.setRowCount(len(remainders))
-    
-    # Заполнение строк
-    for row, remainder in enumerate(remainders):
-        table.setItem(row, 0, _create_text_item(remainder.get('g_marking', '')))
-        table.setItem(row, 1, _create_numeric_item(remainder.get('height', '')))
-        table.setItem(row, 2, _create_numeric_item(remainder.get('width', '')))
-        table.setItem(row, 3, _create_numeric_item(remainder.get('qty', '')))
+    with _bulk_table_update(table):
+        _use_fixed_row_height(table)
+        # Настройка таблицы
+        table.setColumnCount(4)
+        table.setHorizontalHeaderLabels(['Материал', 'Высота', 'Ширина', 'Количество'])
+        table.setRowCount(len(remainders))
+        
+        # Фабрики ячеек под тип значений столбцов (по первой строке)
+        first = remainders[0]
+        height_item = _make_numeric_item_for(type(first.get('height', '')))
+        width_item = _make_numeric_item_for(type(first.get('width', '')))
+        qty_item = _make_numeric_item_for(type(first.get('qty', '')))
+        
+        # Заполнение строк
+        for row, remainder in enumerate(remainders):
+            table.setItem(row, 0, _create_text_item(remainder.get('g_marking', '')))
+            table.setItem(row, 1, height_item(remainder.get('height', '')))
+            table.setItem(row, 2, width_item(remainder.get('width', '')))
+            table.setItem(row, 3, qty_item(remainder.get('qty', '')))
     
     # Гарантированное обновление
     _ensure_table_update(table)
 
 
-def update_remnants_result_table(table: QTableWidget, result, min_remnant_width=100, min_remnant_height=100):
-    """Обновление таблицы деловых остатков результатов"""
-    # Временно отключаем сортировку для корректной загрузки данных
-    table.setSortingEnabled(False)
-    
-    # Собираем полезные остатки из всех листов с правильными атрибутами
-    remnants_grouped = {}
-    
+def _rects_as_arrays(result, rects_attr):
+    """
+    Прямоугольники всех листов результата (атрибут листа rects_attr) в виде параллельных
+    списков (markings, widths, heights): один проход по листам, дальше фильтр и группировка
+    идут одним плоским проходом по столбцам
+    """
+    markings, widths, heights = [], [], []
     for sheet_layout in result.sheets:
-        g_marking = sheet_layout.sheet.material
-        
-        for rect in sheet_layout.free_rectangles:
+        # Обрабатываем прямоугольники если они есть
+        rects = getattr(sheet_layout, rects_attr, None)
+        if not rects:
+            continue
+        sheet_widths, sheet_heights = [], []
+        for rect in rects:
             try:
-                # Используем улучшенную логику: большая сторона >= большего параметра, меньшая >= меньшего
-                element_min_side = min(rect.width, rect.height)
-                element_max_side = max(rect.width, rect.height)
-                param_min = min(min_remnant_width, min_remnant_height)
-                param_max = max(min_remnant_width, min_remnant_height)
-                
-                if element_min_side > param_min and element_max_side > param_max:
-                    # Используем материал листа как g_marking
-                    key = (g_marking, rect.width, rect.height)
-                    if key in remnants_grouped:
-                        remnants_grouped[key] += 1
-                    else:
-                        remnants_grouped[key] = 1
-                        
+                width, height = rect.width, rect.height
             except AttributeError as e:
-                logger.warning(f"Free rectangle missing required attributes: {e}")
-            except Exception as e:
-                logger.error(f"Unexpected error processing free rectangle: {e}")
+                # Пропускаем только некорректный прямоугольник, остальные прямоугольники листа остаются
+                logger.warning(f"Rectangle in '{rects_attr}' missing required attributes: {e}")
+                continue
+            sheet_widths.append(width)
+            sheet_heights.append(height)
+        if not sheet_widths:
+            continue
+        # Интернируем артикул: одинаковые материалы разных листов - один объект строки,
+        # ключи группировки сравниваются по ссылке без посимвольного сравнения
+        material = sheet_layout.sheet.material
+        if isinstance(material, str):
+            material = sys.intern(material)
+        markings.extend(repeat(material, len(sheet_widths)))
+        widths.extend(sheet_widths)
+        heights.extend(sheet_heights)
+    return markings, widths, heights
+
+
+def update_remnants_result_table(table: QTableView, result, min_remnant_width=100, min_remnant_height=100):
+    """Обновление таблицы деловых остатков результатов (QTableView с RectTableModel)"""
+    # Границы фильтра не зависят от прямоугольника - вычисляем один раз на всю таблицу
+    param_min = min(min_remnant_width, min_remnant_height)
+    param_max = max(min_remnant_width, min_remnant_height)
     
-    # Заполнение таблицы
-    table.setRowCount(len(remnants_grouped))
+    # Собираем полезные остатки из всех листов (материал листа используется как g_marking)
+    markings, widths, heights = _rects_as_arrays(result, 'free_rectangles')
     
-    for row, ((g_marking, width, height), count) in enumerate(remnants_grouped.items()):
-        try:
-            table.setItem(row, 0, _create_text_item(g_marking))
-            table.setItem(row, 1, _create_numeric_item(height))
-            table.setItem(row, 2, _create_numeric_item(width))
-            table.setItem(row, 3, _create_numeric_item(count))
-            
-        except ValueError as e:
-            logger.warning(f"Invalid value in remnants table row {row}: {e}")
-        except Exception as e:
-            logger.error(f"Error setting remnants table item in row {row}: {e}")
+    # Используем улучшенную логику: большая сторона >= большего параметра, меньшая >= меньшего.
+    # Меньшая/большая сторона - сравнением без вызова min/max; подсчет - циклом на C внутри Counter
+    remnants_grouped = Counter(
+        (g_marking, width, height)
+        for g_marking, width, height in zip(markings, widths, heights)
+        if (width if width < height else height) > param_min
+        and (width if width > height else height) > param_max
+    )
+    
+    # Одна замена строк модели вместо QTableWidgetItem на каждую ячейку (сортировка применяется моделью)
+    _use_fixed_row_height(table)
+    table.model().set_rows(
+        (g_marking, height, width, count)
+        for (g_marking, width, height), count in remnants_grouped.items()
+    )
     
-    # Включаем сортировку обратно
-    table.setSortingEnabled(True)
     # Гарантированное обновление
     _ensure_table_update(table)
 
 
-def update_waste_results_table(table: QTableWidget, result):
-    """Обновление таблицы отходов результатов"""
-    # Временно отключаем сортировку для корректной загрузки данных
-    table.setSortingEnabled(False)
-    
+def update_waste_results_table(table: QTableView, result):
+    """Обновление таблицы отходов результатов (QTableView с RectTableModel)"""
     # Собираем все отходы со всех листов
-    waste_grouped = {}
+    markings, widths, heights = _rects_as_arrays(result, 'waste_rectangles')
     
-    for sheet_layout in result.sheets:
-        g_marking = sheet_layout.sheet.material
-        
-        # Обрабатываем waste_rectangles если они есть
-        if hasattr(sheet_layout, 'waste_rectangles'):
-            for waste_rect in sheet_layout.waste_rectangles:
-                try:
-                    if waste_rect.width > 0 and waste_rect.height > 0:
-                        key = (g_marking, waste_rect.width, waste_rect.height)
-                        if key in waste_grouped:
-                            waste_grouped[key] += 1
-                        else:
-                            waste_grouped[key] = 1
-                            
-                except AttributeError as e:
-                    logger.error(f"Waste rectangle missing required attributes: {e}")
-                except Exception as e:
-                    logger.error(f"Error processing waste rectangle: {e}")
+    waste_grouped = Counter(
+        (g_marking, width, height)
+        for g_marking, width, height in zip(markings, widths, heights)
+        if width > 0 and height > 0
+    )
     
-    # Заполнение таблицы отходов
-    table.setRowCount(len(waste_grouped))
+    # Одна замена строк модели вместо QTableWidgetItem на каждую ячейку (сортировка применяется моделью)
+    _use_fixed_row_height(table)
+    table.model().set_rows(
+        (g_marking, height, width, count)
+        for (g_marking, width, height), count in waste_grouped.items()
+    )
     
-    for row, ((g_marking, width, height), count) in enumerate(waste_grouped.items()):
-        try:
-            table.setItem(row, 0, _create_text_item(g_marking))
-            table.setItem(row, 1, _create_numeric_item(height))
-            table.setItem(row, 2, _create_numeric_item(width))
-            table.setItem(row, 3, _create_numeric_item(count))
-            
-        except ValueError as e:
-            logger.warning(f"Invalid value in waste table row {row}: {e}")
-        except Exception as e:
-            logger.error(f"Error setting waste table item in row {row}: {e}")
-    
-    # Включаем сортировку обратно
-    table.setSortingEnabled(True)
     # Гарантированное обновление
     _ensure_table_update(table)
 
 
 def update_current_sheet_waste_table(table: QTableWidget, sheet_data):
     """Обновление таблицы отходов для текущего листа"""
-    # Временно отключаем сортировку
-    sorting_enabled = table.isSortingEnabled()
-    table.setSortingEnabled(False)
-    
     # Собираем отходы для текущего листа
     waste_rectangles = sheet_data.get('waste_rectangles', [])
     g_marking = sheet_data.get('g_marking', '')
     
-    # Очищаем текущую таблицу отходов
-    table.setRowCount(0)
-    
-    # ИСПРАВЛЕНО: Правильное заполнение таблицы отходов
-    if waste_rectangles:
-        table.setRowCount(len(waste_rectangles))
+    # Сортировка, сигналы и перерисовка отключены на время заполнения и восстанавливаются в конце
+    with _bulk_table_update(table):
+        _use_fixed_row_height(table)
+        # Очищаем текущую таблицу отходов
+        table.setRowCount(0)
         
-        for row, waste_rect in enumerate(waste_rectangles):
-            try:
-                # Проверяем наличие необходимых ключей
-                if all(key in waste_rect for key in ['width', 'height']):
-                    table.setItem(row, 0, _create_text_item(g_marking))
-                    table.setItem(row, 1, _create_numeric_item(waste_rect['height']))
-                    table.setItem(row, 2, _create_numeric_item(waste_rect['width']))
-                    table.setItem(row, 3, _create_numeric_item(1))  # Количество отходов
-                    
-            except TypeError as e:
-                logger.error(f"Invalid waste rectangle format in row {row}: {e}")
-            except Exception as e:
-                logger.error(f"Error processing waste rectangle in row {row}: {e}")
-    
-    # Восстанавливаем сортировку
-    table.setSortingEnabled(sorting_enabled)
+        # ИСПРАВЛЕНО: Правильное заполнение таблицы отходов
+        if waste_rectangles:
+            table.setRowCount(len(waste_rectangles))
+            
+            for row, waste_rect in enumerate(waste_rectangles):
+                try:
+                    # Проверяем наличие необходимых ключей
+                    if all(key in waste_rect for key in ['width', 'height']):
+                        table.setItem(row, 0, _create_text_item(g_marking))
+                        table.setItem(row, 1, _create_numeric_item(waste_rect['height']))
+                        table.setItem(row, 2, _create_numeric_item(waste_rect['width']))
+                        table.setItem(row, 3, _create_numeric_item(1))  # Количество отходов
+                        
+                except TypeError as e:
+                    logger.error(f"Invalid waste rectangle format in row {row}: {e}")
+                except Exception as e:
+                    logger.error(f"Error processing waste rectangle in row {row}: {e}")
     
     # Гарантированное обновление
     _ensure_table_update(table)
 
 
+class RectTableModel(QAbstractTableModel):
+    """
+    Модель таблицы прямоугольников (Артикул/Высота/Ширина/Кол-во) на основе списка кортежей.
+    
+    В отличие от QTableWidget не создает QTableWidgetItem на каждую ячейку:
+    представление запрашивает data() только для видимых строк.
+    """
+    
+    def __init__(self, headers, rows=None, parent=None):
+        super().__init__(parent)
+        self._headers = list(headers)
+        self._rows = list(rows) if rows else []
+        self._sort_column = -1
+        self._sort_order = Qt.AscendingOrder
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._headers)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        value = self._rows[index.row()][index.column()]
+        if role == Qt.DisplayRole:
+            # Текст формируем сами: число делегат Qt выводит в формате системной локали ("1 605,4999").
+            # Сортировка (_sort_rows) идет по исходным значениям кортежей
+            if isinstance(value, float):
+                return f"{value:.0f}"
+            return str(value)
+        if role == Qt.TextAlignmentRole:
+            # Числа - по правому краю, текст - по левому (как в _create_numeric_item/_create_text_item)
+            if isinstance(value, str):
+                return _LEFT
+            return _RIGHT
+        return None
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self._headers[section]
+        return section + 1
+    
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Сортировка строк по столбцу (вызывается QTableView при setSortingEnabled(True))"""
+        self._sort_column = column
+        self._sort_order = order
+        self.layoutAboutToBeChanged.emit()
+        self._sort_rows()
+        self.layoutChanged.emit()
+    
+    def set_rows(self, rows):
+        """Замена всех строк модели одним сбросом (beginResetModel/endResetModel)"""
+        self.beginResetModel()
+        self._rows = list(rows)
+        self._sort_rows()
+        self.endResetModel()
+    
+    def _sort_rows(self):
+        """Применение последней выбранной сортировки к текущим строкам"""
+        if 0 <= self._sort_column < len(self._headers):
+            column = self._sort_column
+            self._rows.sort(key=lambda row: row[column],
+                            reverse=self._sort_order == Qt.DescendingOrder)
+
+
 class TableManager:
     """Менеджер для управления таблицами"""
     
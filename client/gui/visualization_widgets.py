@@ -2,19 +2,232 @@
 Виджеты визуализации для приложения оптимизации 2D раскроя
 """
 
-from PyQt5.QtWidgets import QGraphicsView, QGraphicsScene, QGroupBox, QVBoxLayout, QHBoxLayout, QLabel, QSlider, QComboBox, QPushButton, QGraphicsTextItem
+from PyQt5.QtWidgets import QGraphicsView, QGraphicsScene, QGroupBox, QVBoxLayout, QHBoxLayout, QLabel, QSlider, QComboBox, QPushButton, QGraphicsSimpleTextItem, QGraphicsItem, QStyleOptionGraphicsItem, QGraphicsRectItem, QGraphicsPathItem, QGraphicsItemGroup
 from PyQt5.QtCore import Qt, QTimer, pyqtSignal
-from PyQt5.QtGui import QBrush, QPen, QColor, QPainter, QFont
+from PyQt5.QtGui import QBrush, QPen, QColor, QPainter, QFont, QFontMetricsF, QPainterPath, QTransform
+import functools
+from operator import attrgetter, itemgetter
 from .config import VISUALIZATION_DEFAULTS, COLORS
 
+# Цвета по умолчанию для элементов палитры, отсутствующих в COLORS
+_PALETTE_DEFAULTS = {
+    'sheet_border': '#FFFFFF',
+    'sheet_fill': '#2A2A2A',
+    'detail_fill': '#4CAF50',
+    'detail_border': '#2E7D32',
+    'remainder_fill': '#FF9800',
+    'remainder_border': '#F57C00',
+    'waste_fill': '#f44336',
+    'waste_border': '#d32f2f',
+    'grid': '#555555',
+    'text': '#FFFFFF'
+}
+
+# Разобранные цвета: строка цвета разбирается один раз за время работы приложения
+_QCOLOR_CACHE = {}
+
+
+def qcolor(name):
+    """QColor элемента палитры COLORS по имени (или цвета, заданного строкой '#RRGGBB')"""
+    color = _QCOLOR_CACHE.get(name)
+    if color is None:
+        color = _QCOLOR_CACHE[name] = QColor(COLORS.get(name, _PALETTE_DEFAULTS.get(name, name)))
+    return color
+
+
+# Кэш графических ресурсов: перо, кисть и шрифт создаются один раз на цвет/размер,
+# а не заново для каждого прямоугольника и надписи
+_PEN_CACHE = {}
+_BRUSH_CACHE = {}
+_FONT_CACHE = {}
+
+
+def _cached_pen(color, width, style=Qt.SolidLine):
+    """Перо заданного цвета (имя палитры или строка цвета), толщины и стиля (общее для всех элементов)"""
+    key = (color, width, style)
+    pen = _PEN_CACHE.get(key)
+    if pen is None:
+        pen = QPen(qcolor(color), width)
+        pen.setStyle(style)
+        _PEN_CACHE[key] = pen
+    return pen
+
+
+def _cached_brush(color):
+    """Кисть заливки заданного цвета - имя палитры или строка цвета (общая для всех элементов)"""
+    brush = _BRUSH_CACHE.get(color)
+    if brush is None:
+        brush = _BRUSH_CACHE[color] = QBrush(qcolor(color))
+    return brush
+
+
+def _bold_font(font_size):
+    """Жирный шрифт Arial заданного размера (один объект QFont на размер)"""
+    font = _FONT_CACHE.get(font_size)
+    if font is None:
+        font = _FONT_CACHE[font_size] = QFont("Arial", font_size, QFont.Weight.Bold)
+    return font
+
+
+# Метрики шрифта для подбора размера надписей (создаются один раз на размер шрифта)
+_METRICS_CACHE = {}
+
+# Опорный размер шрифта: текст измеряется один раз в этом размере, итоговый размер получается пропорцией
+_REF_FONT_SIZE = 20
+
+def _metrics_for(font_size):
+    """Метрики жирного Arial заданного размера (один QFontMetricsF на размер за время работы приложения)"""
+    fm = _METRICS_CACHE.get(font_size)
+    if fm is None:
+        fm = _METRICS_CACHE[font_size] = QFontMetricsF(_bold_font(font_size))
+    return fm
+
+
+# Извлечение (x, y, ширина, высота) из словаря размещения и из объекта прямоугольника
+_DICT_RECT = itemgetter('x', 'y', 'width', 'height')
+_ATTR_RECT = attrgetter('x', 'y', 'width', 'height')
+
+
+def _snap_rect(x, y, width, height):
+    """Прямоугольник в целых пикселях: округляются края, а не размеры, чтобы между соседями не было щелей"""
+    left = round(x)
+    top = round(y)
+    return left, top, round(x + width) - left, round(y + height) - top
+
+
+def _scene_rects(items, getter, scale_factor):
+    """Координаты прямоугольников на сцене в целых пикселях (быстрая заливка без сглаживания краев);
+    при масштабе 1:1 умножения пропускаются"""
+    coords = map(getter, items)
+    if scale_factor == 1.0:
+        return [_snap_rect(x, y, w, h) for x, y, w, h in coords]
+    return [_snap_rect(x * scale_factor, y * scale_factor, w * scale_factor, h * scale_factor) for x, y, w, h in coords]
+
+
+def _rect_item(x, y, width, height, pen, brush=None):
+    """Прямоугольник, еще не добавленный в сцену (собирается в группу листа)"""
+    item = QGraphicsRectItem(x, y, width, height)
+    item.setPen(pen)
+    if brush is not None:
+        item.setBrush(brush)
+    return item
+
+
+def _new_rect_path():
+    """Пустой контур для прямоугольников одной категории (перекрытия закрашиваются, а не вычитаются)"""
+    path = QPainterPath()
+    path.setFillRule(Qt.WindingFill)
+    return path
+
+
+def _add_rect_paths(root, styled_paths, labels):
+    """Добавление в группу контуров категорий (по одному элементу на категорию), затем надписей поверх них"""
+    for path, pen, brush in styled_paths:
+        if not path.isEmpty():
+            item = QGraphicsPathItem(path)
+            item.setPen(pen)
+            item.setBrush(brush)
+            root.addToGroup(item)
+    for label in labels:
+        root.addToGroup(label)
+
+
+def _grid_path(width, height, step):
+    """Линии сетки с шагом step в одном контуре (вместо отдельного элемента сцены на каждую линию)"""
+    path = QPainterPath()
+    if step <= 0:
+        return path
+    
+    # Вертикальные линии
+    x = step
+    while x < width:
+        path.moveTo(x, 0)
+        path.lineTo(x, height)
+        x += step
+    
+    # Горизонтальные линии
+    y = step
+    while y < height:
+        path.moveTo(0, y)
+        path.lineTo(width, y)
+        y += step
+    return path
+
+
+# Надписи ниже этой высоты на экране (в пикселях) не читаются и не рисуются
+_MIN_LABEL_PIXELS = 4
+
+
+class _LabelItem(QGraphicsSimpleTextItem):
+    """Надпись листа (простой текст без QTextDocument), пропускающая отрисовку при слишком мелком масштабе"""
+    
+    def paint(self, painter, option, widget=None):
+        # Элементы вне видимой области QGraphicsView не рисует сам, здесь отсекаем только мелкие надписи
+        lod = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+        if self.boundingRect().height() * lod < _MIN_LABEL_PIXELS:
+            return
+        super().paint(painter, option, widget)
+
+
+def _label_item(text, color, font_size, x, y, width, height):
+    """Надпись, отцентрированная в прямоугольнике (x, y, width, height)"""
+    text_item = _LabelItem(text)
+    text_item.setBrush(_cached_brush(color))
+    text_item.setFont(_bold_font(font_size))
+    # Растеризованная надпись кэшируется в координатах устройства: прокрутка не перерисовывает текст,
+    # при изменении масштаба кэш пересоздается автоматически (надпись остается четкой)
+    text_item.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
+    
+    text_rect = text_item.boundingRect()
+    text_item.setPos(x + (width - text_rect.width()) / 2, y + (height - text_rect.height()) / 2)
+    return text_item
+
+
+def _detach_sheet_groups(graphics_scene, cached_drawings):
+    """Снятие кэшированных групп листов со сцены без удаления (graphics_scene.clear() удалил бы их)"""
+    for cached in cached_drawings.values():
+        root = cached[0] if isinstance(cached, tuple) else cached
+        if root.scene() is graphics_scene:
+            graphics_scene.removeItem(root)
+
+
+def setup_view_only_scene(graphics_scene):
+    """Отключение BSP-индекса сцены: лист только просматривается (без поиска элементов под курсором),
+    а элементов на листе немного (контуры категорий + надписи), поэтому индекс лишь замедляет перестроение"""
+    graphics_scene.setItemIndexMethod(QGraphicsScene.NoIndex)
+
+
+def _add_sheet_group(graphics_scene, root):
+    """Добавление собранной группы листа в сцену одним вызовом"""
+    graphics_scene.addItem(root)
+
+
+def setup_opengl_viewport(graphics_view):
+    """Перевод области просмотра на QOpenGLWidget, если это включено в VISUALIZATION_DEFAULTS['use_opengl']"""
+    if not VISUALIZATION_DEFAULTS.get('use_opengl', False):
+        return False
+    try:
+        from PyQt5.QtWidgets import QOpenGLWidget
+        graphics_view.setViewport(QOpenGLWidget())
+        # Частичные обновления на OpenGL-поверхности неэффективны - перерисовываем кадр целиком
+        graphics_view.setViewportUpdateMode(QGraphicsView.FullViewportUpdate)
+        return True
+    except Exception as e:
+        print(f"⚠️ OpenGL недоступен, используется программная отрисовка: {e}")
+        return False
+
 
 class ZoomableGraphicsView(QGraphicsView):
     """Виджет графической области с возможностью масштабирования"""
     
     def __init__(self, scene, parent=None):
         super().__init__(scene, parent)
-        self.setRenderHint(QPainter.Antialiasing)
+        # Прямоугольники выровнены по осям - сглаживание им не нужно, сглаживаем только текст
+        self.setRenderHint(QPainter.TextAntialiasing)
         self.setDragMode(QGraphicsView.ScrollHandDrag)
+        # Перерисовывается только измененная область (OpenGL-вид ниже переключает режим на полный кадр)
+        self.setViewportUpdateMode(QGraphicsView.MinimalViewportUpdate)
+        setup_opengl_viewport(self)
     
     def wheelEvent(self, event):
         """Обработка колеса мыши для масштабирования"""
@@ -42,8 +255,24 @@ class VisualizationManager:
         self.current_sheet_index = 0
         self.optimization_result = None
         
+        # Элементы управления подключаются позже (setup_navigation / setup_zoom_controls)
+        self.prev_sheet_btn = None
+        self.next_sheet_btn = None
+        self.zoom_slider = None
+        self.zoom_label = None
+        self.reset_zoom_btn = None
+        self.sheet_changed_callback = None
+        
         # Кэш для отрисовки
         self.cached_drawings = {}
+        # Размеры листов последнего показанного результата (для пропуска повторного заполнения комбобокса)
+        self._last_sheets_sig = None
+        
+        # Отложенное применение масштаба (создается в setup_zoom_controls)
+        self._zoom_debounce = None
+        self._pending_zoom = self.current_zoom_level
+        # Центр вида в координатах сцены на начало серии изменений масштаба
+        self._view_center = None
     
     def setup_graphics_view(self, graphics_view, graphics_scene):
         """Настройка графического представления"""
@@ -51,11 +280,15 @@ class VisualizationManager:
         self.graphics_scene = graphics_scene
         
         # Настройка сцены
-        self.graphics_scene.setBackgroundBrush(QBrush(QColor("#1e1e1e")))
+        self.graphics_scene.setBackgroundBrush(_cached_brush("#1e1e1e"))
+        setup_view_only_scene(self.graphics_scene)
         
         # Настройка вида
-        self.graphics_view.setRenderHint(QPainter.Antialiasing)
+        # Сглаживаем только текст (см. ZoomableGraphicsView)
+        self.graphics_view.setRenderHint(QPainter.TextAntialiasing)
         self.graphics_view.setDragMode(QGraphicsView.ScrollHandDrag)
+        self.graphics_view.setViewportUpdateMode(QGraphicsView.MinimalViewportUpdate)
+        setup_opengl_viewport(self.graphics_view)
     
     def setup_navigation(self, sheets_combo, prev_btn, next_btn):
         """Настройка навигации по листам"""
@@ -86,6 +319,11 @@ class VisualizationManager:
         self.zoom_slider.setValue(VISUALIZATION_DEFAULTS['zoom_default'])
         self.zoom_slider.valueChanged.connect(self.on_zoom_changed)
         
+        # Серия событий слайдера при перетаскивании дает одну перестройку вида
+        self._zoom_debounce = QTimer()
+        self._zoom_debounce.setSingleShot(True)
+        self._zoom_debounce.timeout.connect(self._apply_zoom)
+        
         # Кнопка сброса масштаба
         self.reset_zoom_btn.clicked.connect(self.reset_zoom)
         
@@ -96,21 +334,34 @@ class VisualizationManager:
         """Обработка изменения масштаба"""
         if not self.graphics_view:
             return
-            
-        # Сохраняем центр вида
-        center = self.graphics_view.mapToScene(self.graphics_view.viewport().rect().center())
-        
-        # Сбрасываем трансформацию и применяем новый масштаб
-        self.graphics_view.resetTransform()
-        scale_factor = value / 100.0
-        self.graphics_view.scale(scale_factor, scale_factor)
-        
-        # Восстанавливаем центр вида
-        self.graphics_view.centerOn(center)
         
         # Обновляем значение масштаба
         self.current_zoom_level = value
         self.update_zoom_label()
+        
+        # Центр вида запоминается один раз на серию изменений (вид еще в старом масштабе)
+        if self._zoom_debounce is None or not self._zoom_debounce.isActive():
+            self._view_center = self.graphics_view.mapToScene(self.graphics_view.viewport().rect().center())
+        
+        # Трансформация применяется после паузы в событиях слайдера/колеса
+        self._pending_zoom = value
+        if self._zoom_debounce is not None:
+            self._zoom_debounce.start(30)
+        else:
+            self._apply_zoom()
+    
+    def _apply_zoom(self):
+        """Применение последнего запрошенного масштаба к виду"""
+        if not self.graphics_view:
+            return
+        
+        # Абсолютная трансформация одним вызовом (без промежуточного сброса к единичной матрице)
+        scale_factor = self._pending_zoom / 100.0
+        self.graphics_view.setTransform(QTransform.fromScale(scale_factor, scale_factor))
+        
+        # Восстанавливаем центр вида
+        if self._view_center is not None:
+            self.graphics_view.centerOn(self._view_center)
     
     def wheel_zoom(self, event):
         """Масштабирование колесом мыши"""
@@ -127,14 +378,14 @@ class VisualizationManager:
             new_zoom = max(self.current_zoom_level / 1.2, VISUALIZATION_DEFAULTS['zoom_min'])
         
         # Применяем новый масштаб
-        if hasattr(self, 'zoom_slider'):
+        if self.zoom_slider is not None:
             self.zoom_slider.setValue(int(new_zoom))
         
         event.accept()
     
     def reset_zoom(self):
         """Сброс масштаба к значению по умолчанию"""
-        if hasattr(self, 'zoom_slider'):
+        if self.zoom_slider is not None:
             self.zoom_slider.setValue(VISUALIZATION_DEFAULTS['zoom_default'])
         
         # Центрируем вид с задержкой для корректного применения масштаба
@@ -151,32 +402,43 @@ class VisualizationManager:
     
     def update_zoom_label(self):
         """Обновление метки масштаба"""
-        if hasattr(self, 'zoom_label'):
+        if self.zoom_label is not None:
             self.zoom_label.setText(f"{self.current_zoom_level}%")
     
     def update_visualization(self, result):
         """Обновление визуализации с результатами оптимизации"""
         if not self.sheets_combo or not result:
             return
+        
+        # Тот же результат с тем же набором листов - комбобокс и сцена уже актуальны
+        sheets_sig = tuple((sheet_data['width'], sheet_data['height']) for sheet_data in result.sheets)
+        if result is self.optimization_result and sheets_sig == self._last_sheets_sig:
+            return
+        self._last_sheets_sig = sheets_sig
             
         self.optimization_result = result
+        # Новый результат - ранее отрисованные листы больше не актуальны
+        self.cached_drawings = {}
+        
+        # Сигналы комбобокса заблокированы на время перестроения и выбора первого листа:
+        # clear/addItem/setCurrentIndex не запускают show_sheet, первый лист строится один раз ниже
+        self.sheets_combo.blockSignals(True)
         self.sheets_combo.clear()
         
         if not result.sheets:
+            self.sheets_combo.blockSignals(False)
             if self.graphics_scene:
                 self.graphics_scene.clear()
             return
         
         # Заполнение комбобокса листов
-        for i, sheet_data in enumerate(result.sheets):
-            width = sheet_data['width']
-            height = sheet_data['height']
+        for i, (width, height) in enumerate(sheets_sig):
             self.sheets_combo.addItem(f"Лист {i+1} ({width}×{height} мм)")
+        self.sheets_combo.setCurrentIndex(0)
+        self.sheets_combo.blockSignals(False)
         
         # Показ первого листа
-        if result.sheets:
-            self.sheets_combo.setCurrentIndex(0)
-            self.show_sheet(0)
+        self.show_sheet(0)
         
         # Активация кнопок навигации
         self.update_navigation_buttons()
@@ -192,7 +454,8 @@ class VisualizationManager:
         self.current_sheet_index = index
         sheet_data = self.optimization_result.sheets[index]
         
-        # Очищаем сцену
+        # Очищаем сцену (кэшированные листы снимаются со сцены заранее, чтобы не быть удаленными)
+        _detach_sheet_groups(self.graphics_scene, self.cached_drawings)
         self.graphics_scene.clear()
         
         # Получаем размеры листа
@@ -205,25 +468,51 @@ class VisualizationManager:
         # УЛУЧШЕНИЕ 1: Добавляем отступы для свободной прокрутки
         padding = max(sheet_width, sheet_height) * 0.3  # 30% от максимальной стороны листа
         
+        # УЛУЧШЕНИЕ 1: Устанавливаем размер сцены с отступами для свободной прокрутки
+        self.graphics_scene.setSceneRect(
+            -padding, -padding, 
+            (sheet_width * scale_factor) + (padding * 2), 
+            (sheet_height * scale_factor) + (padding * 2)
+        )
+        
+        # Лист уже отрисовывался - возвращаем готовую группу в сцену без перестроения
+        root = self.cached_drawings.get(index)
+        if root is not None:
+            _add_sheet_group(self.graphics_scene, root)
+            if self.zoom_slider is not None:
+                self.on_zoom_changed(self.zoom_slider.value())
+            return
+        
+        # Элементы листа собираются в группу вне сцены и добавляются в сцену одним вызовом
+        root = QGraphicsItemGroup()
+        
         # Рисуем контур листа с четкими границами
-        sheet_pen = QPen(QColor(COLORS['sheet_border']), 3)  # Увеличена толщина
-        self.graphics_scene.addRect(
-            0, 0, sheet_width * scale_factor, sheet_height * scale_factor, 
+        sheet_pen = _cached_pen('sheet_border', 3)  # Увеличена толщина
+        root.addToGroup(_rect_item(
+            0, 0, round(sheet_width * scale_factor), round(sheet_height * scale_factor), 
             sheet_pen
-        )
+        ))
+        
+        # Перья и кисти категорий берутся из кэша один раз на лист, а не на каждый прямоугольник
+        # УЛУЧШЕНИЕ 3: Четкие границы деталей, остатков и отходов (увеличена толщина)
+        detail_pen = _cached_pen('detail_border', 2)
+        detail_brush = _cached_brush('detail_fill')
+        remnant_pen = _cached_pen('remainder_border', 2)
+        remnant_brush = _cached_brush('remainder_fill')
+        waste_pen = _cached_pen('waste_border', 2)
+        waste_brush = _cached_brush('waste_fill')
+        
+        # Прямоугольники одной категории накапливаются в общий контур (один элемент сцены на категорию),
+        # надписи добавляются после контуров, чтобы оказаться поверх них
+        detail_path = _new_rect_path()
+        remnant_path = _new_rect_path()
+        waste_path = _new_rect_path()
+        labels = []
         
         # Рисуем размещенные детали
         placements = sheet_data.get('placements', [])
-        for placement in placements:
-            x = placement['x'] * scale_factor
-            y = placement['y'] * scale_factor
-            width = placement['width'] * scale_factor
-            height = placement['height'] * scale_factor
-            
-            # УЛУЧШЕНИЕ 3: Четкие границы деталей
-            detail_pen = QPen(QColor(COLORS['detail_border']), 2)  # Увеличена толщина
-            detail_brush = QBrush(QColor(COLORS['detail_fill']))
-            detail_rect = self.graphics_scene.addRect(x, y, width, height, detail_pen, detail_brush)
+        for placement, (x, y, width, height) in zip(placements, _scene_rects(placements, _DICT_RECT, scale_factor)):
+            detail_path.addRect(x, y, width, height)
             
             # УЛУЧШЕНИЕ 2: Добавляем текст с названием и размерами
             if 'oi_name' in placement or 'name' in placement:
@@ -248,62 +537,26 @@ class VisualizationManager:
                     font_size = _calculate_adaptive_font_size(detail_text, width, height)
                     
                     if font_size > 0:  # Только если нашли подходящий размер
-                        # Создаем текстовый элемент
-                        text_item = QGraphicsTextItem(detail_text)
-                        text_item.setDefaultTextColor(QColor(COLORS['text']))
-                        text_item.setFont(QFont("Arial", font_size, QFont.Weight.Bold))
-                        
-                        # Позиционируем текст в центре детали
-                        text_rect = text_item.boundingRect()
-                        text_x = x + (width - text_rect.width()) / 2
-                        text_y = y + (height - text_rect.height()) / 2
-                        text_item.setPos(text_x, text_y)
-                        
-                        self.graphics_scene.addItem(text_item)
+                        labels.append(_label_item(detail_text, 'text', font_size, x, y, width, height))
         
         # Рисуем полезные остатки с четкими границами и размерами
-        useful_remnants = sheet_data.get('useful_remnants', [])
-        for remnant in useful_remnants:
-            if hasattr(remnant, 'x') and hasattr(remnant, 'y'):
-                x = remnant.x * scale_factor
-                y = remnant.y * scale_factor
-                width = remnant.width * scale_factor
-                height = remnant.height * scale_factor
-                
-                # УЛУЧШЕНИЕ 3: Четкие границы остатков
-                remnant_pen = QPen(QColor(COLORS['remainder_border']), 2)  # Увеличена толщина
-                remnant_brush = QBrush(QColor(COLORS['remainder_fill']))
-                self.graphics_scene.addRect(x, y, width, height, remnant_pen, remnant_brush)
+        useful_remnants = [remnant for remnant in sheet_data.get('useful_remnants', [])
+                           if hasattr(remnant, 'x') and hasattr(remnant, 'y')]
+        for remnant, (x, y, width, height) in zip(useful_remnants, _scene_rects(useful_remnants, _ATTR_RECT, scale_factor)):
+            remnant_path.addRect(x, y, width, height)
+            
+            # Добавляем размеры остатка если он достаточно большой
+            if width > 80 and height > 40:
+                remnant_text = f"{remnant.width:.0f}×{remnant.height:.0f}"
+                font_size = _calculate_adaptive_font_size(remnant_text, width, height)
                 
-                # Добавляем размеры остатка если он достаточно большой
-                if width > 80 and height > 40:
-                    remnant_text = f"{remnant.width:.0f}×{remnant.height:.0f}"
-                    font_size = _calculate_adaptive_font_size(remnant_text, width, height)
-                    
-                    if font_size > 0:
-                        text_item = QGraphicsTextItem(remnant_text)
-                        text_item.setDefaultTextColor(QColor('#000000'))  # Черный текст на оранжевом фоне
-                        text_item.setFont(QFont("Arial", font_size, QFont.Weight.Bold))
-                        
-                        text_rect = text_item.boundingRect()
-                        text_x = x + (width - text_rect.width()) / 2
-                        text_y = y + (height - text_rect.height()) / 2
-                        text_item.setPos(text_x, text_y)
-                        
-                        self.graphics_scene.addItem(text_item)
+                if font_size > 0:
+                    labels.append(_label_item(remnant_text, '#000000', font_size, x, y, width, height))  # Черный текст на оранжевом фоне
         
         # Рисуем отходы с четкими границами и размерами
         waste_rectangles = sheet_data.get('waste_rectangles', [])
-        for waste in waste_rectangles:
-            x = waste['x'] * scale_factor
-            y = waste['y'] * scale_factor
-            width = waste['width'] * scale_factor
-            height = waste['height'] * scale_factor
-            
-            # УЛУЧШЕНИЕ 3: Четкие границы отходов
-            waste_pen = QPen(QColor(COLORS['waste_border']), 2)  # Увеличена толщина
-            waste_brush = QBrush(QColor(COLORS['waste_fill']))
-            self.graphics_scene.addRect(x, y, width, height, waste_pen, waste_brush)
+        for waste, (x, y, width, height) in zip(waste_rectangles, _scene_rects(waste_rectangles, _DICT_RECT, scale_factor)):
+            waste_path.addRect(x, y, width, height)
             
             # Добавляем размеры отхода если он достаточно большой
             if width > 60 and height > 30:
@@ -311,26 +564,16 @@ class VisualizationManager:
                 font_size = _calculate_adaptive_font_size(waste_text, width, height)
                 
                 if font_size > 0:
-                    text_item = QGraphicsTextItem(waste_text)
-                    text_item.setDefaultTextColor(QColor('#FFFFFF'))  # Белый текст на красном фоне
-                    text_item.setFont(QFont("Arial", font_size, QFont.Weight.Bold))
-                    
-                    text_rect = text_item.boundingRect()
-                    text_x = x + (width - text_rect.width()) / 2
-                    text_y = y + (height - text_rect.height()) / 2
-                    text_item.setPos(text_x, text_y)
-                    
-                    self.graphics_scene.addItem(text_item)
+                    labels.append(_label_item(waste_text, '#FFFFFF', font_size, x, y, width, height))  # Белый текст на красном фоне
         
-        # УЛУЧШЕНИЕ 1: Устанавливаем размер сцены с отступами для свободной прокрутки
-        self.graphics_scene.setSceneRect(
-            -padding, -padding, 
-            (sheet_width * scale_factor) + (padding * 2), 
-            (sheet_height * scale_factor) + (padding * 2)
-        )
+        _add_rect_paths(root, ((detail_path, detail_pen, detail_brush),
+                               (remnant_path, remnant_pen, remnant_brush),
+                               (waste_path, waste_pen, waste_brush)), labels)
+        _add_sheet_group(self.graphics_scene, root)
+        self.cached_drawings[index] = root
         
         # Применяем текущий масштаб
-        if hasattr(self, 'zoom_slider'):
+        if self.zoom_slider is not None:
             self.on_zoom_changed(self.zoom_slider.value())
     
     def on_sheet_selected(self, index):
@@ -338,7 +581,7 @@ class VisualizationManager:
         if index >= 0:
             self.show_sheet(index)
             # Обновляем таблицу отходов для текущего листа, если есть callback
-            if hasattr(self, 'sheet_changed_callback') and self.sheet_changed_callback:
+            if self.sheet_changed_callback is not None:
                 self.sheet_changed_callback(index)
     
     def on_prev_sheet(self):
@@ -364,9 +607,9 @@ class VisualizationManager:
         current_index = self.sheets_combo.currentIndex()
         max_index = self.sheets_combo.count() - 1
         
-        if hasattr(self, 'prev_sheet_btn'):
+        if self.prev_sheet_btn is not None:
             self.prev_sheet_btn.setEnabled(has_sheets and current_index > 0)
-        if hasattr(self, 'next_sheet_btn'):
+        if self.next_sheet_btn is not None:
             self.next_sheet_btn.setEnabled(has_sheets and current_index < max_index)
     
     def draw_grid(self, width, height, scale_factor):
@@ -375,20 +618,10 @@ class VisualizationManager:
             return
             
         grid_size = VISUALIZATION_DEFAULTS['grid_size'] * scale_factor
-        grid_pen = QPen(QColor(COLORS['grid']), 1)
-        grid_pen.setStyle(Qt.DotLine)
+        grid_pen = _cached_pen('grid', 1, Qt.DotLine)
         
-        # Вертикальные линии
-        x = grid_size
-        while x < width * scale_factor:
-            self.graphics_scene.addLine(x, 0, x, height * scale_factor, grid_pen)
-            x += grid_size
-        
-        # Горизонтальные линии
-        y = grid_size
-        while y < height * scale_factor:
-            self.graphics_scene.addLine(0, y, width * scale_factor, y, grid_pen)
-            y += grid_size
+        # Вся сетка - один элемент сцены
+        self.graphics_scene.addPath(_grid_path(width * scale_factor, height * scale_factor, grid_size), grid_pen)
     
     def refresh_visualization(self):
         """Обновление текущего отображения"""
@@ -396,7 +629,8 @@ class VisualizationManager:
             self.show_sheet(self.current_sheet_index) 
 
 
-def visualize_sheet_layout(graphics_scene, sheet_layout, show_grid=True, show_dimensions=True, show_names=True):
+def visualize_sheet_layout(graphics_scene, sheet_layout, show_grid=True, show_dimensions=True, show_names=True,
+                           cached_drawings=None, cache_key=None):
     """
     Функция для отрисовки макета листа на графической сцене
     
@@ -406,6 +640,8 @@ def visualize_sheet_layout(graphics_scene, sheet_layout, show_grid=True, show_di
         show_grid: показывать ли сетку
         show_dimensions: показывать ли размеры
         show_names: показывать ли названия деталей
+        cached_drawings: словарь уже отрисованных листов {cache_key: (группа, прямоугольник листа)}
+        cache_key: ключ листа в cached_drawings (должен учитывать параметры отображения)
     
     Returns:
         QGraphicsRectItem: прямоугольник листа
@@ -413,7 +649,9 @@ def visualize_sheet_layout(graphics_scene, sheet_layout, show_grid=True, show_di
     if not graphics_scene or not sheet_layout:
         return None
     
-    # Очищаем сцену
+    # Очищаем сцену (кэшированные листы снимаются со сцены заранее, чтобы не быть удаленными)
+    if cached_drawings is not None:
+        _detach_sheet_groups(graphics_scene, cached_drawings)
     graphics_scene.clear()
     
     # Получаем размеры листа
@@ -427,30 +665,56 @@ def visualize_sheet_layout(graphics_scene, sheet_layout, show_grid=True, show_di
     # УЛУЧШЕНИЕ 1: Добавляем отступы для свободной прокрутки
     padding = max(sheet_width, sheet_height) * 0.3  # 30% от максимальной стороны листа
     
+    # УЛУЧШЕНИЕ 1: Устанавливаем размер сцены с отступами для свободной прокрутки
+    graphics_scene.setSceneRect(
+        -padding, -padding, 
+        (sheet_width * scale_factor) + (padding * 2), 
+        (sheet_height * scale_factor) + (padding * 2)
+    )
+    
+    # Лист уже отрисовывался с теми же параметрами - возвращаем готовую группу в сцену без перестроения
+    cached = cached_drawings.get(cache_key) if cached_drawings is not None else None
+    if cached is not None:
+        root, sheet_rect = cached
+        _add_sheet_group(graphics_scene, root)
+        return sheet_rect
+    
+    # Элементы листа собираются в группу вне сцены и добавляются в сцену одним вызовом
+    root = QGraphicsItemGroup()
+    
     # УЛУЧШЕНИЕ 3: Рисуем контур листа с четкими границами
-    sheet_pen = QPen(QColor(COLORS.get('sheet_border', '#FFFFFF')), 3)  # Увеличена толщина
-    sheet_brush = QBrush(QColor(COLORS.get('sheet_fill', '#2A2A2A')))
-    sheet_rect = graphics_scene.addRect(
-        0, 0, sheet_width * scale_factor, sheet_height * scale_factor, 
+    sheet_pen = _cached_pen('sheet_border', 3)  # Увеличена толщина
+    sheet_brush = _cached_brush('sheet_fill')
+    sheet_rect = _rect_item(
+        0, 0, round(sheet_width * scale_factor), round(sheet_height * scale_factor), 
         sheet_pen, sheet_brush
     )
+    root.addToGroup(sheet_rect)
     
     # Рисуем сетку если включена
     if show_grid:
-        _draw_grid_on_scene(graphics_scene, sheet_width, sheet_height, scale_factor)
+        _draw_grid_on_scene(root, sheet_width, sheet_height, scale_factor)
+    
+    # Перья и кисти категорий берутся из кэша один раз на лист, а не на каждый прямоугольник
+    # УЛУЧШЕНИЕ 3: Четкие границы деталей, остатков и отходов (увеличена толщина)
+    detail_pen = _cached_pen('detail_border', 2)
+    detail_brush = _cached_brush('detail_fill')
+    remnant_pen = _cached_pen('remainder_border', 2)
+    remnant_brush = _cached_brush('remainder_fill')
+    waste_pen = _cached_pen('waste_border', 2)
+    waste_brush = _cached_brush('waste_fill')
+    
+    # Прямоугольники одной категории - один общий контур, надписи поверх контуров
+    detail_path = _new_rect_path()
+    remnant_path = _new_rect_path()
+    waste_path = _new_rect_path()
+    labels = []
     
     # Рисуем размещенные детали
     if hasattr(sheet_layout, 'placed_details'):
-        for placed_detail in sheet_layout.placed_details:
-            x = placed_detail.x * scale_factor
-            y = placed_detail.y * scale_factor
-            width = placed_detail.width * scale_factor
-            height = placed_detail.height * scale_factor
-            
-            # УЛУЧШЕНИЕ 3: Четкие границы деталей
-            detail_pen = QPen(QColor(COLORS.get('detail_border', '#2E7D32')), 2)  # Увеличена толщина
-            detail_brush = QBrush(QColor(COLORS.get('detail_fill', '#4CAF50')))
-            detail_rect = graphics_scene.addRect(x, y, width, height, detail_pen, detail_brush)
+        placed_details = sheet_layout.placed_details
+        for placed_detail, (x, y, width, height) in zip(placed_details, _scene_rects(placed_details, _ATTR_RECT, scale_factor)):
+            detail_path.addRect(x, y, width, height)
             
             # УЛУЧШЕНИЕ 2: Добавляем название детали и размеры
             if show_names or show_dimensions:
@@ -481,62 +745,28 @@ def visualize_sheet_layout(graphics_scene, sheet_layout, show_grid=True, show_di
                     font_size = _calculate_adaptive_font_size(detail_text, width, height)
                     
                     if font_size > 0:  # Только если нашли подходящий размер
-                        # Создаем текстовый элемент
-                        text_item = QGraphicsTextItem(detail_text)
-                        text_item.setDefaultTextColor(QColor(COLORS.get('text', '#FFFFFF')))
-                        text_item.setFont(QFont("Arial", font_size, QFont.Weight.Bold))
-                        
-                        # Позиционируем текст в центре детали
-                        text_rect = text_item.boundingRect()
-                        text_x = x + (width - text_rect.width()) / 2
-                        text_y = y + (height - text_rect.height()) / 2
-                        text_item.setPos(text_x, text_y)
-                        
-                        graphics_scene.addItem(text_item)
+                        labels.append(_label_item(detail_text, 'text', font_size, x, y, width, height))
     
     # Рисуем полезные остатки с четкими границами и размерами
     if hasattr(sheet_layout, 'free_rectangles'):
-        for remnant in sheet_layout.free_rectangles:
-            if remnant.width > 50 and remnant.height > 50:  # Показываем только крупные остатки
-                x = remnant.x * scale_factor
-                y = remnant.y * scale_factor
-                width = remnant.width * scale_factor
-                height = remnant.height * scale_factor
-                
-                # УЛУЧШЕНИЕ 3: Четкие границы остатков
-                remnant_pen = QPen(QColor(COLORS.get('remainder_border', '#F57C00')), 2)  # Увеличена толщина
-                remnant_brush = QBrush(QColor(COLORS.get('remainder_fill', '#FF9800')))
-                remnant_rect = graphics_scene.addRect(x, y, width, height, remnant_pen, remnant_brush)
+        # Показываем только крупные остатки
+        remnants = [remnant for remnant in sheet_layout.free_rectangles if remnant.width > 50 and remnant.height > 50]
+        for remnant, (x, y, width, height) in zip(remnants, _scene_rects(remnants, _ATTR_RECT, scale_factor)):
+            remnant_path.addRect(x, y, width, height)
+            
+            # Добавляем размеры остатка если он достаточно большой
+            if show_dimensions and width > 80 and height > 40:
+                remnant_text = f"{remnant.width:.0f}×{remnant.height:.0f}"
+                font_size = _calculate_adaptive_font_size(remnant_text, width, height)
                 
-                # Добавляем размеры остатка если он достаточно большой
-                if show_dimensions and width > 80 and height > 40:
-                    remnant_text = f"{remnant.width:.0f}×{remnant.height:.0f}"
-                    font_size = _calculate_adaptive_font_size(remnant_text, width, height)
-                    
-                    if font_size > 0:
-                        text_item = QGraphicsTextItem(remnant_text)
-                        text_item.setDefaultTextColor(QColor('#000000'))  # Черный текст на оранжевом фоне
-                        text_item.setFont(QFont("Arial", font_size, QFont.Weight.Bold))
-                        
-                        text_rect = text_item.boundingRect()
-                        text_x = x + (width - text_rect.width()) / 2
-                        text_y = y + (height - text_rect.height()) / 2
-                        text_item.setPos(text_x, text_y)
-                        
-                        graphics_scene.addItem(text_item)
+                if font_size > 0:
+                    labels.append(_label_item(remnant_text, '#000000', font_size, x, y, width, height))  # Черный текст на оранжевом фоне
     
     # Рисуем отходы с четкими границами и размерами
     if hasattr(sheet_layout, 'waste_rectangles'):
-        for waste in sheet_layout.waste_rectangles:
-            x = waste.x * scale_factor
-            y = waste.y * scale_factor
-            width = waste.width * scale_factor
-            height = waste.height * scale_factor
-            
-            # УЛУЧШЕНИЕ 3: Четкие границы отходов
-            waste_pen = QPen(QColor(COLORS.get('waste_border', '#d32f2f')), 2)  # Увеличена толщина
-            waste_brush = QBrush(QColor(COLORS.get('waste_fill', '#f44336')))
-            waste_rect = graphics_scene.addRect(x, y, width, height, waste_pen, waste_brush)
+        waste_rectangles = sheet_layout.waste_rectangles
+        for waste, (x, y, width, height) in zip(waste_rectangles, _scene_rects(waste_rectangles, _ATTR_RECT, scale_factor)):
+            waste_path.addRect(x, y, width, height)
             
             # Добавляем размеры отхода если он достаточно большой
             if show_dimensions and width > 60 and height > 30:
@@ -544,46 +774,32 @@ def visualize_sheet_layout(graphics_scene, sheet_layout, show_grid=True, show_di
                 font_size = _calculate_adaptive_font_size(waste_text, width, height)
                 
                 if font_size > 0:
-                    text_item = QGraphicsTextItem(waste_text)
-                    text_item.setDefaultTextColor(QColor('#FFFFFF'))  # Белый текст на красном фоне
-                    text_item.setFont(QFont("Arial", font_size, QFont.Weight.Bold))
-                    
-                    text_rect = text_item.boundingRect()
-                    text_x = x + (width - text_rect.width()) / 2
-                    text_y = y + (height - text_rect.height()) / 2
-                    text_item.setPos(text_x, text_y)
-                    
-                    graphics_scene.addItem(text_item)
+                    labels.append(_label_item(waste_text, '#FFFFFF', font_size, x, y, width, height))  # Белый текст на красном фоне
     
-    # УЛУЧШЕНИЕ 1: Устанавливаем размер сцены с отступами для свободной прокрутки
-    graphics_scene.setSceneRect(
-        -padding, -padding, 
-        (sheet_width * scale_factor) + (padding * 2), 
-        (sheet_height * scale_factor) + (padding * 2)
-    )
+    _add_rect_paths(root, ((detail_path, detail_pen, detail_brush),
+                           (remnant_path, remnant_pen, remnant_brush),
+                           (waste_path, waste_pen, waste_brush)), labels)
+    _add_sheet_group(graphics_scene, root)
+    if cached_drawings is not None:
+        cached_drawings[cache_key] = (root, sheet_rect)
     
     return sheet_rect
 
 
-def _draw_grid_on_scene(graphics_scene, width, height, scale_factor):
-    """Отрисовка сетки на сцене"""
+def _draw_grid_on_scene(root, width, height, scale_factor):
+    """Отрисовка сетки на сцене (линии добавляются в группу листа поверх контура)"""
     grid_size = VISUALIZATION_DEFAULTS.get('grid_size', 100) * scale_factor
-    grid_pen = QPen(QColor(COLORS.get('grid', '#555555')), 1)
-    grid_pen.setStyle(Qt.DotLine)
+    grid_pen = _cached_pen('grid', 1, Qt.DotLine)
     
-    # Вертикальные линии
-    x = grid_size
-    while x < width * scale_factor:
-        graphics_scene.addLine(x, 0, x, height * scale_factor, grid_pen)
-        x += grid_size
-    
-    # Горизонтальные линии
-    y = grid_size
-    while y < height * scale_factor:
-        graphics_scene.addLine(0, y, width * scale_factor, y, grid_pen)
-        y += grid_size
+    # Вся сетка - один элемент группы
+    grid_item = QGraphicsPathItem(_grid_path(width * scale_factor, height * scale_factor, grid_size))
+    grid_item.setPen(grid_pen)
+    root.addToGroup(grid_item)
 
 
+# Одинаковые надписи в одинаковых прямоугольниках (типовые детали, повторяющиеся на многих листах)
+# подбираются один раз: результат зависит только от текста и размеров
+@functools.lru_cache(maxsize=4096)
 def _calculate_adaptive_font_size(text, rect_width, rect_height):
     """
     Вычисляет оптимальный размер шрифта для текста в прямоугольнике
@@ -611,23 +827,35 @@ def _calculate_adaptive_font_size(text, rect_width, rect_height):
     else:
         base_font_size = 12  # было 6
     
-    # Пробуем размеры от базового до минимального
-    for font_size in range(base_font_size, 7, -1):  # Минимум 8pt
-        # Создаем временный элемент для измерения
-        temp_item = QGraphicsTextItem(text)
-        temp_item.setFont(QFont("Arial", font_size, QFont.Weight.Bold))
-        text_rect = temp_item.boundingRect()
-        
-        # Более строгие требования для маленьких элементов
-        if min_dimension < 100:
-            margin = 0.75  # 75% заполнения для маленьких элементов
-        else:
-            margin = 0.85  # 85% заполнения для больших элементов
-        
-        # Проверяем, помещается ли текст с отступами
-        if (text_rect.width() <= rect_width * margin and 
-            text_rect.height() <= rect_height * margin):
+    # Более строгие требования для маленьких элементов
+    if min_dimension < 100:
+        margin = 0.75  # 75% заполнения для маленьких элементов
+    else:
+        margin = 0.85  # 85% заполнения для больших элементов
+    
+    # Один замер текста в опорном размере вместо перебора всех размеров:
+    # ширина и высота текста пропорциональны размеру шрифта
+    fm = _metrics_for(_REF_FONT_SIZE)
+    lines = text.split('\n')
+    ref_width = max(fm.horizontalAdvance(line) for line in lines)
+    ref_height = fm.height() * len(lines)
+    if ref_width <= 0 or ref_height <= 0:
+        return base_font_size
+    
+    scale = min(rect_width * margin / ref_width, rect_height * margin / ref_height)
+    font_size = min(int(_REF_FONT_SIZE * scale), base_font_size)
+    
+    # Шрифт масштабируется не строго линейно (хинтинг), поэтому оценку проверяем замером в итоговом размере
+    # и при необходимости уменьшаем; обычно подходит сразу
+    max_width = rect_width * margin
+    max_height = rect_height * margin
+    while font_size >= 8:  # Минимум 8pt
+        fm = _metrics_for(font_size)
+        text_width = max(fm.horizontalAdvance(line) for line in lines)
+        text_height = fm.height() * len(lines)
+        if text_width <= max_width and text_height <= max_height:
             return font_size
+        font_size -= 1
     
     # Если даже минимальный размер не помещается, возвращаем 0
     return 0
\ No newline at end of file
@@ -14,8 +14,24 @@
 
 import os
 import sys
+import gzip
 import json
-from datetime import datetime
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from itertools import chain, repeat
+from pathlib import Path
+
+# orjson (необязательная зависимость) сериализует в байты UTF-8 заметно быстрее stdlib json.
+# Без него используется stdlib с тем же компактным форматом
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Обеспечиваем импорт модулей клиента
 CLIENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
@@ -23,48 +39,319 @@ if CLIENT_DIR not in sys.path:
     sys.path.insert(0, CLIENT_DIR)
 
 from core.api_client import (  # type: ignore
+    TransientAPIError,
     get_details_raw,
-    get_warehouse_main_material,
-    get_warehouse_remainders,
+    get_warehouse_main_material_bulk,
+    get_warehouse_remainders_bulk,
 )
 
 
-def fetch_all_for_grorder(grorderid: int) -> dict:
-    """Загружает все данные для grorderid и возвращает объединённую структуру."""
-    details_data = get_details_raw(grorderid) or {}
+# Кэш ответов API: {ключ: {"t": время записи, "v": ответ}}. В памяти процесса действует всегда
+# (повторные вызовы fetch_all_for_grorder не ходят на сервер), в файл между запусками - без --no-cache
+CACHE_PATH = os.path.join(CLIENT_DIR, ".api_cache.json")
+DEFAULT_CACHE_TTL = 3600
+
+# Буфер выходного файла: дамп уходит на диск крупными блоками, а не мелкими записями
+_IO_BUFFER_SIZE = 1024 * 1024
+
+# Повторы запроса к API при сбое: число попыток и экспоненциальная пауза между ними (секунды)
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.2
+RETRY_MAX_DELAY = 2.0
+
+# fsync выходных файлов перед подменой (сохранность при сбое питания, а не только при обрыве процесса)
+_fsync_output = False
+
+_cache: dict = {}
+_cache_ttl = DEFAULT_CACHE_TTL
+_disk_cache_enabled = False
+_cache_dirty = False
+_cache_lock = threading.Lock()
+
+
+def _dumps(obj, pretty: bool = False) -> bytes:
+    """JSON в байтах UTF-8: компактный или с отступами (orjson, если установлен)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0))
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _write_json_array(f, rows):
+    """Запись списка в JSON построчно (без сборки всего массива в одну строку)"""
+    f.write(b"[")
+    first = True
+    for row in rows:
+        if not first:
+            f.write(b",")
+        f.write(_dumps(row))
+        first = False
+    f.write(b"]")
+
+
+def _write_json_object(f, data: dict):
+    """Компактная запись объекта верхнего уровня по фрагментам: списки пишутся поэлементно.
+    Результат побайтно совпадает с _dumps(data)"""
+    f.write(b"{")
+    first = True
+    for key, value in data.items():
+        if not first:
+            f.write(b",")
+        f.write(_dumps(key) + b":")
+        if isinstance(value, list):
+            _write_json_array(f, value)
+        else:
+            f.write(_dumps(value))
+        first = False
+    f.write(b"}")
+
+
+@contextmanager
+def _open_out(path, compress: bool = False):
+    """Выходной файл для записи байт: буферизованный или gzip (уровень 1 - самое быстрое сжатие).
+    Пишется во временный файл и атомарно подменяет path - при обрыве не остается недописанного файла"""
+    path = os.fspath(path)
+    tmp_path = path + ".tmp"
+    raw = open(tmp_path, "wb", buffering=_IO_BUFFER_SIZE)
+    try:
+        with raw:
+            if compress:
+                with gzip.GzipFile(filename=os.path.basename(path), mode="wb", compresslevel=1, fileobj=raw) as gz:
+                    yield gz
+            else:
+                yield raw
+            if _fsync_output:
+                raw.flush()
+                os.fsync(raw.fileno())
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    os.replace(tmp_path, path)
+
+
+def _write_jsonl(path: str, rows, compress: bool = False):
+    """Запись строк в JSON Lines: одна строка файла - один объект"""
+    with _open_out(path, compress) as f:
+        for row in rows:
+            f.write(_dumps(row))
+            f.write(b"\n")
+
+
+# Части выгрузки JSON Lines (по файлу на часть)
+_JSONL_PARTS = ("details", "remainders", "materials")
+
+
+class _JsonlWriter:
+    """Фоновая запись выгрузки JSON Lines в каталог: части ставятся в очередь по мере загрузки
+    и кодируются в отдельном потоке, пока продолжаются запросы к API"""
+
+    _STOP = object()
+
+    def __init__(self, out_dir, compress: bool = False):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.compress = compress
+        self.files = {}
+        self._error = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="jsonl-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, name: str, rows):
+        """Постановка части (details/remainders/materials) в очередь записи"""
+        self._queue.put((name, rows))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+            if self._error is not None:
+                continue
+            name, rows = item
+            path = os.path.join(self.out_dir, f"{name}.jsonl.gz" if self.compress else f"{name}.jsonl")
+            try:
+                _write_jsonl(path, rows, self.compress)
+                self.files[name] = path
+            except Exception as e:
+                self._error = e
+
+    def close(self, data: dict) -> dict:
+        """Ожидание записи всех частей и запись meta.json с остальными полями.
+        Ошибка фонового потока пробрасывается здесь. Возвращает пути записанных файлов"""
+        self._queue.put(self._STOP)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+        details_data = data.get("details_data", {})
+        meta = {
+            "grorderid": data.get("grorderid"),
+            "fetched_at": data.get("fetched_at"),
+            # Прочие поля ответа details-raw (сами детали - в details.jsonl)
+            "details_data": {k: v for k, v in details_data.items() if k not in ("details", "items")},
+            "files": {name: os.path.basename(self.files[name]) for name in _JSONL_PARTS if name in self.files},
+        }
+        self.files["meta"] = os.path.join(self.out_dir, "meta.json")
+        with _open_out(self.files["meta"]) as f:
+            f.write(_dumps(meta, pretty=True))
+        return self.files
 
-    # Нормализуем ключ для деталей
+
+def _load_cache(ttl: int):
+    """Включение файлового кэша: чтение файла (устаревшие записи отбрасываются)"""
+    global _cache_ttl, _disk_cache_enabled
+    _cache_ttl = ttl
+    _disk_cache_enabled = True
+    try:
+        with open(CACHE_PATH, "rb") as f:
+            stored = json.loads(f.read())
+    except (OSError, ValueError):
+        stored = {}
+    now = time.time()
+    with _cache_lock:
+        for key, entry in stored.items():
+            if now - entry.get("t", 0) < ttl:
+                _cache.setdefault(key, entry)
+
+
+def _save_cache():
+    """Запись кэша на диск (только если появились новые ответы)"""
+    if not (_disk_cache_enabled and _cache_dirty):
+        return
+    try:
+        with _open_out(CACHE_PATH) as f:
+            f.write(_dumps(_cache))
+    except OSError as e:
+        print(f"⚠️ Не удалось сохранить кэш API: {e}")
+
+
+def _cache_get(key: str):
+    """Значение из кэша (None - нет или устарело)"""
+    with _cache_lock:
+        entry = _cache.get(key)
+    if entry is not None and time.time() - entry["t"] < _cache_ttl:
+        return entry["v"]
+    return None
+
+
+def _cache_put(key: str, value):
+    """Запись значения в кэш (в файл попадет при _save_cache)"""
+    global _cache_dirty
+    with _cache_lock:
+        _cache[key] = {"t": time.time(), "v": value}
+        _cache_dirty = True
+
+
+def _with_retry(loader, arg, what: str):
+    """loader(arg, raise_transient=True) с повторами только при временных сбоях (сеть, таймаут, 5xx).
+    Постоянная ошибка (4xx, например несуществующий grorderid) дает None сразу, без повторов.
+    Пауза растет экспоненциально со случайной добавкой, чтобы параллельные повторы не совпадали"""
+    for attempt in range(RETRY_ATTEMPTS):
+        try:
+            return loader(arg, raise_transient=True)
+        except TransientAPIError as e:
+            error = e
+        except Exception as e:
+            print(f"⚠️ Ошибка загрузки {what}: {e}")
+            return None
+        if attempt + 1 < RETRY_ATTEMPTS:
+            delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+            print(f"⚠️ Ошибка загрузки {what} ({error}), повтор через {delay:.1f} с")
+            time.sleep(delay + random.uniform(0, delay))
+    print(f"⚠️ Не удалось загрузить {what} за {RETRY_ATTEMPTS} попытки: {error}")
+    return None
+
+
+def _cached(key: str, loader, arg):
+    """Ответ loader(arg) из кэша по ключу; пустые ответы (ошибки API) не кэшируются"""
+    value = _cache_get(key)
+    if value is None:
+        value = _with_retry(loader, arg, key)
+        if value:
+            _cache_put(key, value)
+    return value
+
+
+def _fetch_warehouse(loader, field: str, ids: list) -> list:
+    """Строки склада (поле ответа field) для всех goodsid: из кэша, недостающие - одним bulk-запросом.
+    Возвращает списки строк в порядке ids"""
+    by_goodsid = {}
+    missing = []
+    for goodsid in ids:
+        rows = _cache_get(f"{field}:{goodsid}")
+        if rows is None:
+            missing.append(goodsid)
+        else:
+            by_goodsid[goodsid] = rows
+
+    if missing:
+        resp = _with_retry(loader, missing, f"данных склада ({field})")
+        if resp is None:
+            print(f"⚠️ Данные склада ({field}) не загружены для {len(missing)} goodsid")
+        else:
+            # Успешный ответ: goodsid без строк тоже кэшируем (пустым списком)
+            fetched = {goodsid: [] for goodsid in missing}
+            for row in resp.get(field, []):
+                fetched.setdefault(row.get("goodsid"), []).append(row)
+            for goodsid, rows in fetched.items():
+                _cache_put(f"{field}:{goodsid}", rows)
+            by_goodsid.update(fetched)
+
+    return [by_goodsid.get(goodsid, []) for goodsid in ids]
+
+
+def fetch_all_for_grorder(grorderid: int, on_part=None) -> dict:
+    """Загружает все данные для grorderid и возвращает объединённую структуру.
+    on_part(name, rows) вызывается, как только готова часть details/remainders/materials"""
+    details_data = _cached(f"details:{grorderid}", get_details_raw, grorderid) or {}
+
+    # Нормализуем ключ для деталей (на копии: исходный ответ хранится в кэше)
+    details_data = dict(details_data)
     if "items" in details_data and "details" not in details_data:
         details_data["details"] = details_data["items"]
 
     details_list = details_data.get("details", []) or []
 
-    # Собираем уникальные goodsid
-    unique_goodsids = set()
-    for detail in details_list:
-        goodsid = detail.get("goodsid")
-        if goodsid:
-            unique_goodsids.add(goodsid)
+    # Собираем уникальные goodsid (map/filter/set целиком в C, без байткода на каждую деталь).
+    # dict.get вместо itemgetter: у детали goodsid может отсутствовать
+    unique_goodsids = set(filter(None, map(dict.get, details_list, repeat("goodsid"))))
 
-    all_remainders = []
-    all_materials = []
+    if on_part is not None:
+        on_part("details", details_list)
 
-    for goodsid in unique_goodsids:
-        try:
-            rem_resp = get_warehouse_remainders(goodsid) or {}
-            if "remainders" in rem_resp:
-                all_remainders.extend(rem_resp["remainders"])
+    parts = {"remainders": [], "materials": []}
 
-            mat_resp = get_warehouse_main_material(goodsid) or {}
-            if "main_material" in mat_resp:
-                all_materials.extend(mat_resp["main_material"])
-        except Exception as e:
-            print(f"⚠️ Ошибка загрузки данных склада для goodsid={goodsid}: {e}")
-            continue
+    # Остатки и основные материалы грузятся bulk-запросами по всему списку goodsid (2 запроса вместо 2N),
+    # оба вида данных - параллельно. Строки упорядочены по goodsid, а не по порядку ответов
+    ids = list(unique_goodsids)
+    if ids:
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            futures = {
+                ex.submit(_fetch_warehouse, get_warehouse_remainders_bulk, "remainders", ids): "remainders",
+                ex.submit(_fetch_warehouse, get_warehouse_main_material_bulk, "main_material", ids): "materials",
+            }
+            # Каждая часть отдается on_part сразу по готовности, не дожидаясь второго запроса
+            for future in as_completed(futures):
+                name = futures[future]
+                # Одинаковые строки - разные записи склада (например, два остатка одного размера), объединяем как есть
+                parts[name] = list(chain.from_iterable(future.result()))
+                if on_part is not None:
+                    on_part(name, parts[name])
+    elif on_part is not None:
+        for name, rows in parts.items():
+            on_part(name, rows)
+
+    all_remainders = parts["remainders"]
+    all_materials = parts["materials"]
 
     return {
         "grorderid": grorderid,
-        "fetched_at": datetime.utcnow().isoformat() + "Z",
+        "fetched_at": datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z"),
         "details_data": details_data,
         "remainders": all_remainders,
         "materials": all_materials,
@@ -74,22 +361,54 @@ def fetch_all_for_grorder(grorderid: int) -> dict:
 def main(argv: list[str]) -> int:
     import argparse
 
-    default_out_dir = os.path.join(CLIENT_DIR, "test_data")
+    default_out_dir = Path(CLIENT_DIR) / "test_data"
     parser = argparse.ArgumentParser(description="Выгрузка тестовых данных сменного задания в JSON")
+    parser.add_argument("--format", choices=("json", "jsonl"), default="json",
+                        help="json - один файл; jsonl - каталог (имя --out без .json) с файлами JSON Lines и meta.json")
     parser.add_argument("--grorderid", type=int, default=31442, help="ID сменного задания")
-    parser.add_argument("--out", type=str, default=os.path.join(default_out_dir, "test_data_31442.json"), help="Путь к выходному JSON")
+    parser.add_argument("--out", type=Path, default=default_out_dir / "test_data_31442.json", help="Путь к выходному JSON")
+    parser.add_argument("--no-cache", action="store_true", help="Не использовать файловый кэш ответов API")
+    parser.add_argument("--pretty", action="store_true", help="Форматированный JSON с отступами (для ручного просмотра)")
+    parser.add_argument("--gzip", action="store_true", help="Сжимать выходные файлы gzip (к имени добавляется .gz)")
+    parser.add_argument("--fsync", action="store_true", help="fsync выходных файлов перед атомарной подменой")
+    parser.add_argument("--cache-ttl", type=int, default=DEFAULT_CACHE_TTL, help="Время жизни записей кэша, секунды")
 
     args = parser.parse_args(argv)
 
-    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    global _fsync_output
+    _fsync_output = args.fsync
+
+    if not args.no_cache:
+        _load_cache(args.cache_ttl)
+
+    # Путь разрешается один раз, дальше используется готовый объект
+    out = args.out.resolve()
+    out.parent.mkdir(parents=True, exist_ok=True)
+
+    # JSON Lines пишется фоновым потоком по мере загрузки частей (кодирование идет параллельно с запросами к API)
+    writer = None
+    if args.format == "jsonl":
+        out_dir = out.with_suffix("")
+        writer = _JsonlWriter(out_dir, args.gzip)
 
     print(f"Loading data for grorderid={args.grorderid}...")
-    data = fetch_all_for_grorder(args.grorderid)
+    data = fetch_all_for_grorder(args.grorderid, on_part=writer.put if writer is not None else None)
+    _save_cache()
 
-    with open(args.out, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    if writer is not None:
+        writer.close(data)
+        print(f"Saved: {out_dir}")
+    else:
+        # Компактный JSON по умолчанию (вдвое меньше и быстрее) пишется фрагментами через крупный буфер:
+        # в памяти не собирается вся строка дампа. Кириллица остается UTF-8, без \uXXXX-экранирования
+        out_path = out.with_name(out.name + ".gz") if args.gzip else out
+        with _open_out(out_path, args.gzip) as f:
+            if args.pretty:
+                f.write(_dumps(data, pretty=True))
+            else:
+                _write_json_object(f, data)
+        print(f"Saved: {out_path}")
 
-    print(f"Saved: {args.out}")
     print(
         "Counts -> Details: {d}; Remainders: {r}; Materials: {m}".format(
             d=len(data.get('details_data', {}).get('details', [])),